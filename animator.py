@@ -1,21 +1,36 @@
+import os
 from enum import Enum
 from dataclasses import dataclass
-from os import write
-from PIL import Image
-from imageio.typing import ArrayLike
-from backend import Block, Renderer, Camera
-from typing import List, Tuple, cast, Optional
+from hashlib import blake2b
+from backend import AdaptiveBuffer, Block, BlockView, ColumnBuffer, ColumnRuns, Renderer, Camera, Resample, Scene
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar, cast, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from queue import Full, Queue
+from threading import Event, Thread
 import numpy as np
-from numpy.typing import NDArray
-import imageio
+from numpy.typing import ArrayLike, NDArray
+import profiling
+from timeline import Timeline
+
+if TYPE_CHECKING:
+	from PIL import Image
+
+T = TypeVar("T")
 
 class RenderQuality(Enum):
 	FAST = (1_000, (100,500))
 	ACCURATE = (100_000, (300, 1500))
+	# 4 slices per output row, averaged down: anti-aliased edges for a fraction of ACCURATE's slices
+	SMOOTH = (6_000, (300, 1500), Resample.AREA)
+	# the same frames as ACCURATE, rendered as runs between block edges instead of slice by slice
+	ADAPTIVE = (100_000, (300, 1500), Resample.NEAREST, True)
 
-	def __init__(self, vector_resolution:int, image_resolution:Tuple[int,int]) -> None:
+	def __init__(self, vector_resolution:int, image_resolution:Tuple[int,int], resample:Resample=Resample.NEAREST, adaptive:bool=False) -> None:
 		self._vector_resolution = vector_resolution
 		self._image_resolution = image_resolution
+		self._resample = resample
+		self._adaptive = adaptive
 
 	@property
 	def vector_resolution(self):
@@ -25,50 +40,440 @@ class RenderQuality(Enum):
 	def image_resolution(self):
 		return self._image_resolution
 
+	@property
+	def resample(self):
+		return self._resample
+
+	@property
+	def adaptive(self):
+		return self._adaptive
+
+	def column_buffer(self, renderer:Renderer, blocks:Sequence[Block]|Scene) -> ColumnBuffer|AdaptiveBuffer:
+		buffer = AdaptiveBuffer if self.adaptive else ColumnBuffer
+		return buffer(renderer, blocks, self.vector_resolution)
+
+
+def prefetch(items:Iterable[T], queue_size:int) -> Iterator[T]:
+	'''
+	Pulls `items` on a background thread into a queue holding at most `queue_size` of them,
+	so the producer can run ahead of the consumer without ever holding more than that in memory.
+	Exceptions raised by the producer are re-raised in the consumer.
+	'''
+	done = object()
+	queue:Queue = Queue(maxsize=queue_size)
+	stopped = Event()
+
+	def put(item) -> bool:
+		while not stopped.is_set():
+			try:
+				queue.put(item, timeout=0.1)
+				return True
+			except Full:
+				continue
+		return False
+
+	def produce() -> None:
+		try:
+			for item in items:
+				if not put(item):
+					return
+		except BaseException as error:
+			put(error)
+			return
+		put(done)
+
+	producer = Thread(target=produce, daemon=True)
+	producer.start()
+	try:
+		while True:
+			item = queue.get()
+			if item is done:
+				return
+			if isinstance(item, BaseException):
+				raise item
+			yield item
+	finally:
+		stopped.set()
+		producer.join()
+
+
+@dataclass
+class FrameStats:
+	'''
+	Counts from the most recent animation.
+	`unchanged` frames had exactly the same column as the frame before,
+	`repeated` frames had the same column as some earlier frame (found by hash).
+	Both reuse the frame already upscaled for that column instead of rendering it again.
+	`cached` frames were found in the animator's `cache` and weren't rendered at all.
+	'''
+	frames:int = 0
+	rendered:int = 0
+	unchanged:int = 0
+	repeated:int = 0
+	cached:int = 0
+
+	@property
+	def reused(self) -> int:
+		return self.unchanged + self.repeated + self.cached
+
+	def merge(self, other:"FrameStats") -> None:
+		self.frames += other.frames
+		self.rendered += other.rendered
+		self.unchanged += other.unchanged
+		self.repeated += other.repeated
+		self.cached += other.cached
+
+
+class FrameCache:
+	'''
+	Upscaled frames keyed by a hash of the compact column they were upscaled from, keeping the `size` most recently used.
+	Frames handed out are shared between every frame they stand for, so they must not be written to.
+	'''
+	def __init__(self, stats:FrameStats, size:int=8) -> None:
+		self.stats = stats
+		self.size = size
+		self.frames:OrderedDict[bytes, NDArray[np.uint8]] = OrderedDict()
+		self.previous:Optional[NDArray[np.uint8]] = None
+
+	def frame(self, column:NDArray[np.uint8]|ColumnRuns, changed:bool, render:Callable[[], NDArray[np.uint8]]) -> NDArray[np.uint8]:
+		'''
+		`changed`: whether `column` may differ from the previous call's. If not, the previous frame comes back without hashing.
+		`render`: upscales `column`, only called if it hasn't been seen recently.
+		'''
+		self.stats.frames += 1
+		if not changed and self.previous is not None:
+			self.stats.unchanged += 1
+			return self.previous
+
+		data = column.signature() if isinstance(column, ColumnRuns) else np.ascontiguousarray(column).data
+		key = blake2b(data, digest_size=16).digest()
+		frame = self.frames.get(key)
+		if frame is None:
+			frame = render()
+			self.stats.rendered += 1
+			self.frames[key] = frame
+			if len(self.frames) > self.size:
+				self.frames.popitem(last=False)
+		else:
+			self.stats.repeated += 1
+			self.frames.move_to_end(key)
+		self.previous = frame
+		return frame
+
+
+# set up once per worker process by `start_worker`, see `Animator.render_parallel`
+worker_state:Dict = {}
+
+def start_worker(animator:"Animator", target_index:int, x_steps:List[float], y_steps:List[float], quality:"RenderQuality") -> None:
+	worker_state.update(animator=animator, target_index=target_index, x_steps=x_steps, y_steps=y_steps, quality=quality)
+
+def render_frame_range(first:int, last:int) -> Tuple[List[NDArray[np.uint8]], FrameStats]:
+	'''
+	Reused frames come back as the same array repeated, which pickles only once.
+	'''
+	animator:Animator = worker_state["animator"]
+	animator.frame_stats = FrameStats()
+	frames = animator.render_steps(
+		worker_state["target_index"],
+		worker_state["x_steps"][first:last],
+		worker_state["y_steps"][first:last],
+		worker_state["quality"]
+	)
+	return list(frames), animator.frame_stats
+
 
 class Animator(Renderer):
-	def __init__(self, blocks:List[Block]) -> None:
+	def __init__(self, blocks:List[Block]|Scene, camera:Optional[Camera]=None) -> None:
 		'''
 		A subclass of `Renderer`. Default block Id is set to the one-indexed position in the list.
 		'''
 
-		super().__init__(blocks=blocks, camera=Camera(forced_screen_height=1))
+		super().__init__(blocks=blocks, camera=Camera(forced_screen_height=1) if camera is None else camera)
+		self.frame_stats = FrameStats()
 
-	def slide(self, block_id:int, start:Tuple[float,float], end:Tuple[float,float], frame_count:int, write_path:Optional[str]=None, quality:Optional[RenderQuality]=None):
+	def slide(
+			self,
+			block_id:int,
+			start:Tuple[float,float],
+			end:Tuple[float,float],
+			frame_count:int,
+			write_path:Optional[str]=None,
+			quality:Optional[RenderQuality]=None,
+			workers:Optional[int]=None,
+			fps:int=30,
+			frames_directory:Optional[str]=None
+		):
+		'''
+		`frames_directory`: record the frames there first (see `record_slide`), so an interrupted slide
+		run again with the same arguments carries on from the last frame saved, then encode them from there.
+		'''
 		quality = RenderQuality.ACCURATE if quality is None else quality
+		if frames_directory is not None:
+			self.record_slide(block_id, start, end, frame_count, frames_directory, quality=quality, workers=workers)
+			self.encode_frames(frames_directory, fps=fps, write_path=write_path)
+			return
 
 		target_block = self.retrieve_block_from_id(block_id)
-		inbetweens = self.generate_inbetweens(frame_count, target_block, start, end, quality=quality)
-		self.make_video_from_frames(inbetweens,write_path=write_path)
+		inbetweens = self.iter_inbetweens(frame_count, target_block, start, end, quality=quality, workers=workers)
+		self.make_video_from_frames(inbetweens, fps=fps, write_path=write_path)
+
+	def record_slide(
+			self,
+			block_id:int,
+			start:Tuple[float,float],
+			end:Tuple[float,float],
+			frame_count:int,
+			directory:str,
+			quality:Optional[RenderQuality]=None,
+			workers:Optional[int]=None,
+			checkpoint_every:int=30
+		) -> int:
+		'''
+		Renders a slide into a `FrameStore` in `directory`, saving progress every `checkpoint_every` frames.
+		If an earlier run of the same slide (same scene, camera, quality and path) stopped part way,
+		only the frames it didn't get to are rendered.
+
+		returns how many frames were rendered.
+		'''
+		from cache import render_key
+		from framestore import FrameStore
+		quality = RenderQuality.ACCURATE if quality is None else quality
+		target_block = self.retrieve_block_from_id(block_id)
+		# the target's position before the slide doesn't change any frame
+		target_block.x, target_block.y = start
+		scene_key = render_key(self.blocks, self.camera, self.bg_color, quality.vector_resolution, quality.image_resolution, quality.resample)
+		signature = blake2b(repr((scene_key, block_id, tuple(start), tuple(end))).encode(), digest_size=16).hexdigest()
+
+		with FrameStore.resume(directory, frame_count, quality.image_resolution, signature, checkpoint_every) as store:
+			first_frame = store.completed
+			for frame in self.iter_inbetweens(frame_count, target_block, start, end, quality, workers=workers, first_frame=first_frame):
+				store.append(frame)
+			return store.completed - first_frame
+
+	def encode_frames(self, directory:str, fps:int=30, write_path:Optional[str]=None) -> str:
+		'''
+		Encodes the frames recorded in `directory` (see `record_slide`), read straight out of the memory-mapped file.
+		Raises ValueError if the recording isn't finished.
 
-	def generate_inbetweens(self, frame_count:int, target_block:Block, start:Tuple[float,float], end:Tuple[float,float], quality:RenderQuality):
+		returns the path written to, see `make_video_from_frames`.
+		'''
+		from framestore import FrameStore
+		with FrameStore.open(directory) as store:
+			if not store.done:
+				raise ValueError(f"only {store.completed} of {store.frame_count} frames in {directory} have been recorded")
+			# each frame is a view of the memmap, paged in as the encoder reads it
+			return self.make_video_from_frames(iter(store.completed_frames), fps=fps, write_path=write_path, queue_size=0)
+
+	def iter_inbetweens(
+			self,
+			frame_count:int,
+			target_block:BlockView,
+			start:Tuple[float,float],
+			end:Tuple[float,float],
+			quality:RenderQuality,
+			workers:Optional[int]=None,
+			first_frame:int=0
+		) -> Iterator[NDArray[np.uint8]]:
+		'''
+		Renders the frames of a slide one at a time as `(height, width, 3)` uint8 arrays,
+		so nothing but the current frame is kept around.
+
+		`workers`: number of processes to render on. Frames still come out in order and identical to the serial render.
+				   Worker processes don't consult `cache`.
+
+		`first_frame`: start part way through the slide, e.g. to finish one that was interrupted.
+
+		Frames whose column matches an earlier frame's are that earlier array again (see `FrameCache`), counted in `frame_stats`.
+		'''
+		self.frame_stats = FrameStats()
+		x_steps:List[float] = np.linspace(start[0], end[0], frame_count)[first_frame:].tolist() # type:ignore
+		y_steps:List[float] = np.linspace(start[1], end[1], frame_count)[first_frame:].tolist() # type:ignore
 		target_block.x, target_block.y = start
-		x_steps:List[float] = np.linspace(start[0], end[0], frame_count).tolist() # type:ignore
-		y_steps:List[float] = np.linspace(start[1], end[1], frame_count).tolist() # type:ignore
-		inbetweens:List[Image.Image] = []
-
-		for x_position, y_position in zip(x_steps, y_steps):
-			target_block.x = x_position
-			target_block.y = y_position
-			self.generate_all_position_vectors(resolution=quality.vector_resolution)
-			image = self.generate_image(self.blocks, quality.image_resolution)
-			inbetweens.append(image)
-
-		return inbetweens
+		target_index = target_block.row
+		if workers is not None and workers > 1:
+			yield from self.render_parallel(target_index, x_steps, y_steps, quality, workers)
+			# leave the block where the serial render would have
+			if x_steps:
+				target_block.x, target_block.y = x_steps[-1], y_steps[-1]
+		else:
+			yield from self.render_steps(target_index, x_steps, y_steps, quality)
+
+	def render_steps(self, target_index:int, x_steps:List[float], y_steps:List[float], quality:RenderQuality) -> Iterator[NDArray[np.uint8]]:
+		target_block = self.blocks[target_index]
+		# only the target block moves, so everything else is projected once, when the first frame isn't in the cache
+		column_buffer:Optional[ColumnBuffer|AdaptiveBuffer] = None
+		frame_cache = FrameCache(self.frame_stats)
+		upscale = lambda: self.generate_frame(cast(ColumnBuffer|AdaptiveBuffer, column_buffer).column, quality.image_resolution, resample=quality.resample)
+
+		for index, (x_position, y_position) in enumerate(zip(x_steps, y_steps)):
+			with profiling.frame(index):
+				target_block.x = x_position
+				target_block.y = y_position
+				key, frame = self.lookup_frame(quality)
+				if frame is None:
+					if column_buffer is None:
+						column_buffer = quality.column_buffer(self, self.blocks)
+						changed = True
+					else:
+						changed = column_buffer.update([target_index])
+					frame = self.store_frame(key, frame_cache.frame(column_buffer.column, changed, upscale))
+			yield frame
+
+	def render_parallel(self, target_index:int, x_steps:List[float], y_steps:List[float], quality:RenderQuality, workers:int) -> Iterator[NDArray[np.uint8]]:
+		'''
+		Ships the scene to each worker process once, then hands out contiguous ranges of frame indices.
+		At most two ranges per worker are in flight, so finished frames never pile up waiting to be encoded.
+		'''
+		frame_count = len(x_steps)
+		chunk_size = max(1, frame_count // (workers * 4))
+		ranges = [(first, min(first + chunk_size, frame_count)) for first in range(0, frame_count, chunk_size)]
+		# a copy without any position vectors hanging off the blocks, so it pickles small
+		scene = Animator(self.blocks.copy(), camera=self.camera)
+		scene.bg_color = self.bg_color
+
+		with ProcessPoolExecutor(
+			max_workers=workers,
+			initializer=start_worker,
+			initargs=(scene, target_index, x_steps, y_steps, quality)
+		) as executor:
+			pending:Deque[Future] = deque()
+			for first, last in ranges:
+				pending.append(executor.submit(render_frame_range, first, last))
+				if len(pending) >= 2 * workers:
+					yield from self.collect_range(pending.popleft())
+			while pending:
+				yield from self.collect_range(pending.popleft())
+
+	def collect_range(self, future:Future) -> List[NDArray[np.uint8]]:
+		frames, stats = future.result()
+		self.frame_stats.merge(stats)
+		return frames
+
+	def animate(self, timeline:Timeline, write_path:Optional[str]=None, quality:Optional[RenderQuality]=None, fps:int=30):
+		quality = RenderQuality.ACCURATE if quality is None else quality
+		self.make_video_from_frames(self.iter_timeline(timeline, quality), fps=fps, write_path=write_path)
+
+	def pan(self, start:Tuple[float,float], end:Tuple[float,float], frame_count:int, write_path:Optional[str]=None, quality:Optional[RenderQuality]=None, fps:int=30):
+		'''
+		Moves the camera from `start` to `end` with every block staying put.
+		'''
+		self.animate(Timeline(frame_count).move_camera(start, end), write_path=write_path, quality=quality, fps=fps)
+
+	def iter_timeline(self, timeline:Timeline, quality:RenderQuality) -> Iterator[NDArray[np.uint8]]:
+		'''
+		Renders every frame of `timeline`. All positions are worked out before the first frame, and each frame
+		only re-projects the blocks that moved on it. Frames are reused the same way as `iter_inbetweens`.
+
+		A camera path moves `camera` itself, which offsets the whole scene at once: every block is re-projected
+		in one batch on the frames the camera moves, without touching any block's position.
+		'''
+		self.frame_stats = FrameStats()
+		if not timeline.frame_count:
+			return
+		rows = np.array([self.blocks.row_of(block_id) for block_id in timeline.block_ids], dtype=np.intp)
+		x, y = timeline.evaluate()
+		moved = timeline.changes(x, y)
+		camera_path = timeline.evaluate_camera()
+		scene = self.blocks
+		column_buffer:Optional[ColumnBuffer|AdaptiveBuffer] = None
+		frame_cache = FrameCache(self.frame_stats)
+		upscale = lambda: self.generate_frame(cast(ColumnBuffer|AdaptiveBuffer, column_buffer).column, quality.image_resolution, resample=quality.resample)
+
+		for index in range(timeline.frame_count):
+			with profiling.frame(index):
+				changed = moved[index]
+				if changed.any():
+					scene.x[rows[changed]] = x[index, changed]
+					scene.y[rows[changed]] = y[index, changed]
+				if camera_path is not None:
+					self.camera.x, self.camera.y = float(camera_path[0][index]), float(camera_path[1][index])
+				key, frame = self.lookup_frame(quality)
+				if frame is None:
+					if column_buffer is None:
+						column_buffer = quality.column_buffer(self, scene)
+						column_changed = True
+					else:
+						# every tracked block is checked, not just this frame's, in case earlier frames came from the cache.
+						# A camera move is picked up by the buffer itself
+						column_changed = column_buffer.update(rows)
+					frame = self.store_frame(key, frame_cache.frame(column_buffer.column, column_changed, upscale))
+			yield frame
+
+	def lookup_frame(self, quality:RenderQuality) -> Tuple[Optional[str], Optional[NDArray[np.uint8]]]:
+		'''
+		returns the cache key for the scene as it is now and the frame cached under it, if there's a `cache`.
+		'''
+		if self.cache is None:
+			return None, None
+		from cache import render_key
+		key = render_key(self.blocks, self.camera, self.bg_color, quality.vector_resolution, quality.image_resolution, quality.resample)
+		frame = self.cache.get(key)
+		if frame is not None:
+			self.frame_stats.frames += 1
+			self.frame_stats.cached += 1
+		return key, frame
+
+	def store_frame(self, key:Optional[str], frame:NDArray[np.uint8]) -> NDArray[np.uint8]:
+		if self.cache is not None and key is not None:
+			# frames are never written to once made, so the cache can keep this one as is
+			self.cache.put(key, frame, copy=False)
+		return frame
+
+	def generate_inbetweens(self, frame_count:int, target_block:BlockView, start:Tuple[float,float], end:Tuple[float,float], quality:RenderQuality, workers:Optional[int]=None) -> List["Image.Image"]:
+		'''
+		Reused frames come back as the same `Image` again.
+		'''
+		from PIL import Image
+		images:List[Image.Image] = []
+		previous:Optional[NDArray[np.uint8]] = None
+		for frame in self.iter_inbetweens(frame_count, target_block, start, end, quality, workers=workers):
+			images.append(images[-1] if frame is previous else Image.fromarray(frame))
+			previous = frame
+		return images
 	
-	def make_video_from_frames(self, raw_frames:List[Image.Image], fps=30, write_path:Optional[str]=None):
-		write_path = "outputs/output.mp4" if write_path is None else "outputs/" + write_path
-
-		frames = [np.array(frame) for frame in raw_frames]
-		imageio.mimwrite("outputs/output.mp4", cast(List[ArrayLike], frames), fps=30)		
-
-blocks = [
-	Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
-	Block(x=1.726,y=-0.22,height=0.072, color=(0,255,255)),
-	Block(x=5, y=0, height=100, color=(255,205,50)), # should essentially form a background
-	Block(x=1, y=45, height=0.4, color=(0,255,0)), # should not show
-	Block(x = 1.73, y=0.25, height=0.25, color=(100,125,255))
-]
-
-animator = Animator(blocks=blocks)
-animator.slide(block_id=2, start=(1.726,-0.22), end=(5.4, 0.22), frame_count=60)
+	def make_video_from_frames(self, raw_frames:Iterable["Image.Image|NDArray[np.uint8]"], fps:int=30, write_path:Optional[str]=None, queue_size:int=4) -> str:
+		'''
+		Encodes frames as they arrive. Rendering runs ahead on a background thread by at most `queue_size` frames
+		while this thread feeds the encoder, so the two overlap and peak memory doesn't depend on how many frames there are.
+		`queue_size=0` renders and encodes each frame in turn on this thread instead.
+
+		`write_path`: relative to `outputs/` unless absolute, `output.mp4` if not given. Missing directories are created.
+
+		returns the path written to.
+		'''
+		import imageio
+		write_path = os.path.join("outputs", "output.mp4" if write_path is None else write_path)
+		directory = os.path.dirname(write_path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		frames = prefetch(raw_frames, queue_size) if queue_size > 0 else iter(raw_frames)
+
+		with imageio.get_writer(write_path, fps=fps) as writer:
+			previous = None
+			data = None
+			for index, frame in enumerate(frames):
+				with profiling.stage("encode", frame=index):
+					# a reused frame was already converted for the writer last time
+					if frame is not previous:
+						data = np.asarray(frame)
+						previous = frame
+					writer.append_data(cast(ArrayLike, data))
+		return write_path
+
+def main() -> None:
+	'''
+	Demo: slides the cyan block back until it disappears behind the yellow background block.
+	'''
+	blocks = [
+		Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
+		Block(x=1.726,y=-0.22,height=0.072, color=(0,255,255)),
+		Block(x=5, y=0, height=100, color=(255,205,50)), # should essentially form a background
+		Block(x=1, y=45, height=0.4, color=(0,255,0)), # should not show
+		Block(x = 1.73, y=0.25, height=0.25, color=(100,125,255))
+	]
+
+	animator = Animator(blocks=blocks)
+	animator.slide(block_id=2, start=(1.726,-0.22), end=(5.4, 0.22), frame_count=60)
+
+if __name__ == "__main__":
+	main()
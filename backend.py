@@ -1,13 +1,21 @@
 # https://www.desmos.com/calculator/2o5u3ueaqb
 
+import heapq
 import math
-from PIL import Image
+from bisect import bisect_left
+from functools import lru_cache
 import numpy as np
-from typing import Final, List, Optional, Sequence, Tuple, TypeAlias
-from mpmath import mp, tan, atan
-from numpy.typing import NDArray
+from dataclasses import dataclass
+from enum import Enum
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, Final, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeAlias, cast, overload
+from numpy.typing import ArrayLike, NDArray
+import profiling
+
+if TYPE_CHECKING:
+	from PIL import Image
+	from cache import RenderCache
 
-mp.dps = 50  
 Color: TypeAlias = Tuple[int,int,int]
 Vec: TypeAlias = Sequence[Color]
 BG:Color = (255,255,255)
@@ -28,7 +36,257 @@ class ContinuousRange:
 	def __contains__(self, value:float|int) -> bool:
 		return self.start <= value <= self.stop
 
+class SpanVector(Sequence[Color]):
+	'''
+	A position vector stored as a run: `color` on slices `start` to `stop` (inclusive) and `bg_color` everywhere else.
+	A block always projects to one contiguous run, so this is all a position vector ever holds.
+	Indexes, iterates and compares like the dense list; `dense` builds that list when it is really needed.
+	'''
+	__slots__ = ("start", "stop", "color", "dimension", "bg_color")
+
+	def __init__(self, start:int, stop:int, color:Color, dimension:int, bg_color:Color=BG) -> None:
+		self.start = start
+		self.stop = stop
+		self.color = color
+		self.dimension = dimension
+		self.bg_color = bg_color
+
+	@classmethod
+	def empty(cls, dimension:int, bg_color:Color=BG) -> "SpanVector":
+		return cls(0, -1, bg_color, dimension, bg_color)
+
+	@property
+	def is_empty(self) -> bool:
+		return self.stop < self.start
+
+	def __len__(self) -> int:
+		return self.dimension
+
+	@overload
+	def __getitem__(self, index:int) -> Color: ...
+	@overload
+	def __getitem__(self, index:slice) -> List[Color]: ...
+	def __getitem__(self, index:int|slice) -> Color|List[Color]:
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(self.dimension))]
+		if not -self.dimension <= index < self.dimension:
+			raise IndexError(index)
+		index %= self.dimension
+		return self.color if self.start <= index <= self.stop else self.bg_color
+
+	def __iter__(self) -> Iterator[Color]:
+		return iter(self.dense())
+
+	def __eq__(self, other:object) -> bool:
+		if isinstance(other, SpanVector):
+			return self.dense() == other.dense()
+		if isinstance(other, Sequence):
+			return self.dense() == list(other)
+		return NotImplemented
+
+	def __repr__(self) -> str:
+		return f"SpanVector(start={self.start}, stop={self.stop}, color={self.color}, dimension={self.dimension})"
+
+	def dense(self) -> List[Color]:
+		vector = [self.bg_color] * self.dimension
+		if not self.is_empty:
+			vector[self.start:self.stop+1] = [self.color] * (self.stop - self.start + 1)
+		return vector
+
+
+class ColumnRuns:
+	'''
+	A rendered column stored as runs of one colour, top of the screen first: run `i` is `colors[i]` on slices
+	`starts[i]` up to the next run's start. Adjacent runs always differ in colour.
+	Stands in for a dense `(resolution, 3)` column wherever a column gets upscaled (see `Renderer.rasterize_runs`).
+	'''
+	__slots__ = ("starts", "colors", "resolution")
+
+	def __init__(self, starts:NDArray[np.int64], colors:NDArray[np.uint8], resolution:int) -> None:
+		starts = np.asarray(starts, dtype=np.int64)
+		colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+		keep = np.ones(len(starts), dtype=np.bool_)
+		keep[1:] = np.any(colors[1:] != colors[:-1], axis=1)
+		self.starts:NDArray[np.int64] = starts[keep]
+		self.colors:NDArray[np.uint8] = colors[keep]
+		self.resolution = resolution
+
+	@classmethod
+	def from_column(cls, column:NDArray[np.uint8]) -> "ColumnRuns":
+		changes = np.flatnonzero(np.any(column[1:] != column[:-1], axis=1)) + 1
+		starts = np.concatenate(([0], changes))
+		return cls(starts, column[starts], len(column))
+
+	@property
+	def lengths(self) -> NDArray[np.int64]:
+		return np.diff(np.append(self.starts, self.resolution))
+
+	def run_at(self, slices:NDArray[np.intp]) -> NDArray[np.intp]:
+		'''
+		the run each of `slices` falls in.
+		'''
+		return np.searchsorted(self.starts, slices, side="right") - 1
+
+	def dense(self) -> NDArray[np.uint8]:
+		return np.repeat(self.colors, self.lengths, axis=0)
+
+	def splice(self, starts:NDArray[np.int64], colors:NDArray[np.uint8], end:int) -> "ColumnRuns":
+		'''
+		returns these runs with slices `starts[0]` to `end` (inclusive) replaced by the runs `starts`, `colors`.
+		'''
+		before = self.starts < starts[0]
+		after = self.starts > end + 1
+		pieces_starts = [self.starts[before], starts]
+		pieces_colors = [self.colors[before], colors]
+		if end + 1 < self.resolution:
+			pieces_starts += [np.array([end + 1]), self.starts[after]]
+			pieces_colors += [self.colors[self.run_at(np.array([end + 1]))], self.colors[after]]
+		return ColumnRuns(np.concatenate(pieces_starts), np.concatenate(pieces_colors), self.resolution)
+
+	def signature(self) -> bytes:
+		return self.starts.tobytes() + self.colors.tobytes() + self.resolution.to_bytes(8, "little")
+
+	def __eq__(self, other:object) -> bool:
+		if not isinstance(other, ColumnRuns):
+			return NotImplemented
+		return (
+			self.resolution == other.resolution
+			and np.array_equal(self.starts, other.starts)
+			and np.array_equal(self.colors, other.colors)
+		)
+
+	def __repr__(self) -> str:
+		return f"ColumnRuns(runs={len(self.starts)}, resolution={self.resolution})"
+
+
+class Partitions:
+	'''
+	The slices from `Renderer.quantize`, kept as arrays of edges so that a y position maps
+	straight to its slice index instead of being tested against every `ContinuousRange`.
+	Uses the same inclusive `start <= value <= stop` rule, so a value on a boundary lands in the lower slice.
+
+	Built once per resolution, use `get_partitions` rather than constructing these directly.
+	'''
+	def __init__(self, resolution:int) -> None:
+		self.resolution = resolution
+		range_size = 1/resolution
+		self.starts:NDArray[np.float64] = np.arange(resolution, dtype=np.float64) * range_size
+		self.stops:NDArray[np.float64] = self.starts + range_size
+		self.starts.flags.writeable = False
+		self.stops.flags.writeable = False
+		self._starts:List[float] = self.starts.tolist()
+		self._stops:List[float] = self.stops.tolist()
+
+	def __len__(self) -> int:
+		return self.resolution
+
+	def __getitem__(self, index:int) -> ContinuousRange:
+		return ContinuousRange(self._starts[index], self._stops[index])
+
+	def find(self, y_position:float) -> int:
+		# stops are sorted, so the first slice whose stop is >= y is the only one that can contain it
+		index = bisect_left(self._stops, y_position)
+		if index < self.resolution and self._starts[index] <= y_position:
+			return index
+		raise OutOfRangeError("Object is outside the screen and could not be mapped")
+
+	def find_all(self, y_positions:NDArray[np.float64]) -> Tuple[NDArray[np.int64], NDArray[np.bool_]]:
+		'''
+		Vectorised `find`. Returns the slice indices along with a mask of which positions were on screen
+		(indices of off screen positions are clipped into range and should be ignored).
+		'''
+		indices = np.searchsorted(self.stops, y_positions, side="left")
+		found = indices < self.resolution
+		indices = np.minimum(indices, self.resolution - 1)
+		found &= self.starts[indices] <= y_positions
+		return indices, found
+
+
+@lru_cache(maxsize=16)
+def get_partitions(resolution:int) -> Partitions:
+	return Partitions(resolution)
+
+
+class Precision(Enum):
+	'''
+	`FAST` does all projection maths in native floats.
+	`REFERENCE` uses mpmath (at `REFERENCE_DPS` digits) and the original per-block pipeline, for checking `FAST` against.
+	'''
+	FAST = "fast"
+	REFERENCE = "reference"
+
+
+REFERENCE_DPS:Final = 50
+
+@lru_cache(maxsize=None)
+def load_mpmath() -> ModuleType:
+	'''
+	mpmath is only imported once something asks for `Precision.REFERENCE`, and set to `REFERENCE_DPS` digits then.
+	'''
+	import mpmath
+	mpmath.mp.dps = REFERENCE_DPS
+	return mpmath
+
+
+class Resample(Enum):
+	'''
+	How a column is scaled to the output height.
+	`NEAREST` picks one slice per row (what PIL's NEAREST resize does).
+	`AREA` averages every slice under a row, for anti-aliased edges when there are more slices than rows.
+	'''
+	NEAREST = "nearest"
+	AREA = "area"
+
+
+@lru_cache(maxsize=16)
+def get_nearest_rows(dimension:int, height:int) -> NDArray[np.intp]:
+	'''
+	The slice each of the `height` output rows takes its colour from. This is exactly what PIL's NEAREST
+	resize picks: it starts half a step in and walks the source by repeated addition, so this does too.
+	'''
+	step = dimension / height
+	positions = np.full(height, step)
+	positions[0] = 0.5 * step
+	rows = np.cumsum(positions).astype(np.intp)
+	np.minimum(rows, dimension - 1, out=rows)
+	rows.flags.writeable = False
+	return rows
+
+
+@lru_cache(maxsize=16)
+def get_area_kernel(dimension:int, height:int) -> Tuple[NDArray[np.intp], NDArray[np.float64], float]:
+	'''
+	Where each output row's edges fall along the column: the slice index and how far into that slice,
+	plus the width of a row in slices. Used to average a column with a running sum.
+	'''
+	edges = np.arange(height + 1) * (dimension / height)
+	slices = np.minimum(edges.astype(np.intp), dimension - 1)
+	fractions = edges - slices
+	slices.flags.writeable = False
+	fractions.flags.writeable = False
+	return slices, fractions, dimension / height
+
+
+class Compositor(Enum):
+	'''
+	How `Renderer.rasterize` resolves overlapping spans. They all give the same column.
+	`DEPTH_BUFFER` depth tests every block over its whole span (`Renderer.composite`).
+	`SWEEP` walks the span edges with a heap of open spans (`Renderer.composite_spans`).
+	`FRONT_TO_BACK` paints nearest first into whatever is still uncovered, skipping blocks that are
+	already hidden and stopping once every slice is covered (`Renderer.composite_front_to_back`).
+	`VECTORIZED` has no Python loop at all but works on every covered slice of every span (`Renderer.composite_vectorized`).
+	'''
+	DEPTH_BUFFER = "depth_buffer"
+	SWEEP = "sweep"
+	FRONT_TO_BACK = "front_to_back"
+	VECTORIZED = "vectorized"
+
+
 class Camera:
+	'''
+	`x` and `y` can be changed freely to pan: blocks are offset by them as a whole when rendering.
+	`m` and the projection screen only depend on `theta`, so they're worked out again only when it changes.
+	'''
 	x:float
 	y:float
 
@@ -37,12 +295,15 @@ class Camera:
 			x:Optional[float]=None,
 			y:Optional[float]=None,
 			theta:Optional[float]=None,
-			forced_screen_height:Optional[float]=None
+			forced_screen_height:Optional[float]=None,
+			precision:Optional[Precision]=None
 		) -> None:
 
+		self.precision = Precision.FAST if precision is None else precision
+		arctan = load_mpmath().atan if self.precision is Precision.REFERENCE else math.atan
 		assigned_theta:float = 0.0
 		if (theta is None) and (not forced_screen_height is None): 
-			assigned_theta = 2*atan(forced_screen_height/4)
+			assigned_theta = 2*arctan(forced_screen_height/4)
 		elif (not theta is None) and (forced_screen_height is None):
 			assigned_theta = theta
 		elif theta is None and forced_screen_height is None:
@@ -57,8 +318,40 @@ class Camera:
 
 		self.x = x
 		self.y = y
-		self.theta:float = assigned_theta
-		self.m = tan(0.5 * self.theta)
+		self.theta = assigned_theta
+
+	@property
+	def theta(self) -> float:
+		return self._theta
+
+	@theta.setter
+	def theta(self, theta:float) -> None:
+		self._theta = theta
+		self._m = load_mpmath().tan(0.5 * theta) if self.precision is Precision.REFERENCE else math.tan(0.5 * theta)
+		self._projected_screen:Optional[ProjectionScreen] = None
+
+	@property
+	def m(self) -> float:
+		'''
+		Gradient of the top edge of the view. Setting it changes `theta` to match.
+		'''
+		return self._m
+
+	@m.setter
+	def m(self, m:float) -> None:
+		self._theta = 2 * (load_mpmath().atan(m) if self.precision is Precision.REFERENCE else math.atan(m))
+		self._m = m
+		self._projected_screen = None
+
+	@property
+	def projected_screen(self) -> "ProjectionScreen":
+		if self._projected_screen is None:
+			self._projected_screen = ProjectionScreen(self)
+		return self._projected_screen
+
+	@property
+	def position(self) -> Tuple[float,float]:
+		return (self.x, self.y)
 
 class Screen:
 	def __init__(self) -> None:
@@ -72,11 +365,18 @@ class Screen:
 
 class ProjectionScreen:
 	def __init__(self, camera:Camera) -> None:
-		self.x = 2
+		self.x, self.top, self.bottom, self.height = ProjectionScreen.edges(camera.m)
 		self.y = 0
-		self.top = camera.m * self.x # intersection of screen.x and y = mx
-		self.bottom = -camera.m * self.x # y = -mx
-		self.height = 2 * camera.m * self.x 
+
+	@staticmethod
+	def edges(m):
+		'''
+		`x`, `top`, `bottom` and `height` of the screen for a view with gradient `m`, which can be an array of them.
+		'''
+		x = 2
+		top = m * x # intersection of screen.x and y = mx
+		bottom = -m * x # y = -mx
+		return x, top, bottom, 2 * m * x
 
 class Block:
 	def __init__(self,
@@ -95,32 +395,370 @@ class Block:
 		self.color:Tuple[int,int,int] = (0,0,0) if color is None else color
 		self.id = id
 
+class BlockView:
+	'''
+	A block living in a `Scene`. Reads and writes go straight to the scene's columns, so a view is
+	just a row number and holds no geometry of its own.
+	'''
+	__slots__ = ("scene", "row")
+
+	def __init__(self, scene:"Scene", row:int) -> None:
+		self.scene = scene
+		self.row = row
+
+	@property
+	def x(self) -> float:
+		return float(self.scene.x[self.row])
+
+	@x.setter
+	def x(self, value:float) -> None:
+		self.scene.x[self.row] = value
+
+	@property
+	def y(self) -> float:
+		return float(self.scene.y[self.row])
+
+	@y.setter
+	def y(self, value:float) -> None:
+		self.scene.y[self.row] = value
+
+	@property
+	def height(self) -> float:
+		return float(self.scene.height[self.row])
+
+	@height.setter
+	def height(self, value:float) -> None:
+		self.scene.height[self.row] = value
+
+	@property
+	def top(self) -> float:
+		return self.y + 0.5*self.height
+
+	@property
+	def bottom(self) -> float:
+		return self.y - 0.5*self.height
+
+	@property
+	def color(self) -> Color:
+		red, green, blue = self.scene.color[self.row].tolist()
+		return (red, green, blue)
+
+	@color.setter
+	def color(self, value:Color) -> None:
+		self.scene.color[self.row] = value
+
+	@property
+	def id(self) -> int:
+		return int(self.scene.id[self.row])
+
+	@property
+	def vector(self) -> Vec:
+		return self.scene.vectors.get(self.row, [])
+
+	@vector.setter
+	def vector(self, value:Vec) -> None:
+		self.scene.vectors[self.row] = value
+
+	def __eq__(self, other:object) -> bool:
+		return isinstance(other, BlockView) and other.scene is self.scene and other.row == self.row
+
+	def __hash__(self) -> int:
+		return hash((id(self.scene), self.row))
+
+
+class Scene:
+	'''
+	Every block of a scene stored column-wise: `x`, `y`, `height`, `color` and `id` arrays with a row per block,
+	plus an id -> row lookup (`rows`). Indexing or iterating gives `BlockView`s.
+
+	Nothing resolution sized is kept per block. `vectors` only fills up if the dense
+	`generate_all_position_vectors` path is used.
+	'''
+	def __init__(self, capacity:int=16) -> None:
+		self.size = 0
+		self._x:NDArray[np.float64] = np.zeros(capacity, dtype=np.float64)
+		self._y:NDArray[np.float64] = np.zeros(capacity, dtype=np.float64)
+		self._height:NDArray[np.float64] = np.zeros(capacity, dtype=np.float64)
+		self._color:NDArray[np.uint8] = np.zeros((capacity, 3), dtype=np.uint8)
+		self._id:NDArray[np.int64] = np.zeros(capacity, dtype=np.int64)
+		self.rows:Dict[int,int] = {}
+		self.vectors:Dict[int,Vec] = {}
+		# one past the largest id so far, so `add` needn't search `rows` for a free one
+		self.next_id = 1
+
+	@classmethod
+	def from_blocks(cls, blocks:Iterable[Block], renumber:bool=False) -> "Scene":
+		'''
+		`renumber`: give the blocks their one-indexed positions as ids instead of their own.
+		'''
+		blocks = list(blocks)
+		scene = cls(capacity=max(len(blocks), 1))
+		for i, block in enumerate(blocks):
+			scene.add(block.x, block.y, block.height, block.color, i+1 if renumber else block.id)
+		return scene
+
+	@classmethod
+	def from_arrays(cls, x:ArrayLike, y:ArrayLike, height:ArrayLike, color:ArrayLike, id:Optional[ArrayLike]=None) -> "Scene":
+		x = np.asarray(x, dtype=np.float64)
+		scene = cls(capacity=max(len(x), 1))
+		scene.size = len(x)
+		scene._x[:scene.size] = x
+		scene._y[:scene.size] = y
+		scene._height[:scene.size] = height
+		scene._color[:scene.size] = color
+		scene._id[:scene.size] = np.arange(1, scene.size+1) if id is None else id
+		scene.rows = {block_id: row for row, block_id in enumerate(scene._id[:scene.size].tolist())}
+		if len(scene.rows) != scene.size:
+			raise ValueError("block ids must be unique")
+		scene.next_id = max(scene.rows, default=0) + 1
+		return scene
+
+	@property
+	def x(self) -> NDArray[np.float64]:
+		return self._x[:self.size]
+
+	@property
+	def y(self) -> NDArray[np.float64]:
+		return self._y[:self.size]
+
+	@property
+	def height(self) -> NDArray[np.float64]:
+		return self._height[:self.size]
+
+	@property
+	def color(self) -> NDArray[np.uint8]:
+		return self._color[:self.size]
+
+	@property
+	def id(self) -> NDArray[np.int64]:
+		return self._id[:self.size]
+
+	def add(self, x:float, y:float, height:float, color:Optional[Color]=None, id:Optional[int]=None) -> BlockView:
+		'''
+		Appends a block, growing the columns geometrically. Blocks without an id get the next free one (one-indexed).
+		'''
+		id = self.next_id if id is None else id
+		if id in self.rows:
+			raise ValueError(f"a block with id {id} is already in the scene")
+		if self.size == len(self._x):
+			self.reserve(2 * len(self._x))
+		row = self.size
+		self._x[row] = x
+		self._y[row] = y
+		self._height[row] = height
+		self._color[row] = (0,0,0) if color is None else color
+		self._id[row] = id
+		self.rows[id] = row
+		self.next_id = max(self.next_id, id + 1)
+		self.size += 1
+		return BlockView(self, row)
+
+	def reserve(self, capacity:int) -> None:
+		for name in ("_x", "_y", "_height", "_color", "_id"):
+			column = getattr(self, name)
+			grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+			grown[:self.size] = column[:self.size]
+			setattr(self, name, grown)
+
+	def row_of(self, block_id:int) -> int:
+		try:
+			return self.rows[block_id]
+		except KeyError:
+			raise NotFounderror(block_id) from None
+
+	def view(self, block_id:int) -> BlockView:
+		return BlockView(self, self.row_of(block_id))
+
+	def copy(self) -> "Scene":
+		'''
+		A copy of the columns only (no position vectors).
+		'''
+		return Scene.from_arrays(self.x, self.y, self.height, self.color, self.id)
+
+	def __len__(self) -> int:
+		return self.size
+
+	def __getitem__(self, row:int) -> BlockView:
+		if not -self.size <= row < self.size:
+			raise IndexError(row)
+		return BlockView(self, row % self.size)
+
+	def __iter__(self) -> Iterator[BlockView]:
+		return (BlockView(self, row) for row in range(self.size))
+
+
+class ViewIndex:
+	'''
+	A scene's blocks sorted by the slope (y/x) of their bottom and top edges as seen from the camera.
+	A block is in view exactly when that slope interval overlaps the camera's `[-m, m]`, so the candidates
+	are a prefix of one ordering intersected with a suffix of the other, and blocks far outside the view
+	are never touched. Blocks at or behind the camera (x <= 0) are left out entirely.
+
+	Built from the scene and camera position as they are; build a new one after blocks or the camera move.
+	'''
+	def __init__(self, scene:Scene, camera:Optional[Camera]=None) -> None:
+		self.origin:Tuple[float,float] = (0, 0) if camera is None else camera.position
+		x, y = to_camera_space(scene, self.origin)
+		rows = np.flatnonzero(x > 0)
+		self.lower:NDArray[np.float64] = np.full(len(scene), np.inf)
+		self.upper:NDArray[np.float64] = np.full(len(scene), -np.inf)
+		self.lower[rows] = (y[rows] - 0.5*scene.height[rows]) / x[rows]
+		self.upper[rows] = (y[rows] + 0.5*scene.height[rows]) / x[rows]
+		self.by_lower:NDArray[np.intp] = rows[np.argsort(self.lower[rows], kind="stable")]
+		self.by_upper:NDArray[np.intp] = rows[np.argsort(self.upper[rows], kind="stable")]
+		self.sorted_lower = self.lower[self.by_lower]
+		self.sorted_upper = self.upper[self.by_upper]
+
+	def visible_rows(self, m:float) -> NDArray[np.intp]:
+		'''
+		rows whose slope interval overlaps `[-m, m]`, in scene order.
+		'''
+		reach = m + cull_tolerance(m)
+		under_top = self.by_lower[:np.searchsorted(self.sorted_lower, reach, side="right")]
+		over_bottom = self.by_upper[np.searchsorted(self.sorted_upper, -reach, side="left"):]
+		# walk whichever candidate list is shorter and check the other edge directly
+		if len(under_top) <= len(over_bottom):
+			rows = under_top[self.upper[under_top] >= -reach]
+		else:
+			rows = over_bottom[self.lower[over_bottom] <= reach]
+		return np.sort(rows)
+
+
+def to_camera_space(scene:Scene, origin:Tuple[float,float], rows:Optional[NDArray[np.intp]]=None) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+	'''
+	`x` and `y` of the scene's blocks (or just `rows` of them) relative to a camera at `origin`.
+	A camera at the origin gets the columns themselves rather than a copy.
+	'''
+	x = scene.x if rows is None else scene.x[rows]
+	y = scene.y if rows is None else scene.y[rows]
+	origin_x, origin_y = origin
+	return (x - origin_x if origin_x else x), (y - origin_y if origin_y else y)
+
+
+def cull_tolerance(m:float|NDArray[np.float64]) -> float|NDArray[np.float64]:
+	# culling must never drop a block the projection would still show, so the view is widened by a hair
+	return 1e-9 * (abs(m) + 1)
+
+
+def in_wedge(x:NDArray[np.float64], y:NDArray[np.float64], height:NDArray[np.float64], m:float|NDArray[np.float64]) -> NDArray[np.bool_]:
+	'''
+	`Renderer.cull` for a camera with gradient `m`, which can also be given per block.
+	'''
+	reach = m + cull_tolerance(m)
+	in_front = x > 0
+	with np.errstate(divide="ignore", invalid="ignore"):
+		lower = (y - 0.5*height) / x
+		upper = (y + 0.5*height) / x
+	return in_front & (lower <= reach) & (upper >= -reach)
+
+
+def project_onto_partitions(
+		x:NDArray[np.float64],
+		y:NDArray[np.float64],
+		height:NDArray[np.float64],
+		screen_x:float,
+		screen_top:float|NDArray[np.float64],
+		screen_bottom:float|NDArray[np.float64],
+		screen_height:float|NDArray[np.float64],
+		resolution:int
+	) -> Tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+	'''
+	`Renderer.project_columns` against the given projection screen, whose edges can also be given per block.
+	'''
+	with profiling.stage("project"), np.errstate(divide="ignore", invalid="ignore"):
+		scale_factor = screen_x / x
+		new_y = scale_factor * y
+		new_height = scale_factor * height
+		top = np.minimum(new_y + 0.5*new_height, screen_top)
+		bottom = np.maximum(new_y - 0.5*new_height, screen_bottom)
+		top = top / screen_height + 0.5
+		bottom = bottom / screen_height + 0.5
+
+	with profiling.stage("quantize"):
+		partitions = get_partitions(resolution)
+		top_indices, top_found = partitions.find_all(top)
+		bottom_indices, bottom_found = partitions.find_all(bottom)
+	# anything at or behind the camera is never shown, even when its flipped projection would land on screen
+	visible = top_found & bottom_found & (bottom_indices <= top_indices) & (x > 0)
+	return bottom_indices, top_indices, visible
+
+
+@dataclass
+class RenderStats:
+	'''
+	Counts from the most recent `Renderer.rasterize`.
+	`culled` blocks were rejected before projection (behind the camera or outside the view),
+	`visible` blocks project onto at least one slice,
+	`occluded` of those were never painted because nearer blocks already covered them (`Compositor.FRONT_TO_BACK` only).
+	'''
+	blocks:int = 0
+	culled:int = 0
+	projected:int = 0
+	visible:int = 0
+	occluded:int = 0
+
+
+def as_scene(blocks:Sequence[Block]|Scene) -> Scene:
+	'''
+	A `Scene` as is, or a list of blocks copied into one and renumbered, as `Renderer` does, so the ids
+	the blocks happen to carry never clash.
+	'''
+	return blocks if isinstance(blocks, Scene) else Scene.from_blocks(blocks, renumber=True)
+
+
 class Renderer:
-	def __init__(self, blocks:Optional[List[Block]]=None, camera:Optional[Camera]=None) -> None:
+	def __init__(self, blocks:Optional[List[Block]|Scene]=None, camera:Optional[Camera]=None) -> None:
+		'''
+		A list of `Block`s is copied into a new `Scene`, with each block's one-indexed position as its id.
+		The `Block`s themselves are left alone, so changing one afterwards doesn't change the render:
+		move blocks through `blocks` (or `retrieve_block_from_id`) instead. A `Scene` is used as is.
+		'''
 		self.camera = Camera() if camera is None else camera
 		self.screen = Screen()
-		self.blocks:List[Block] = [] if blocks is None else blocks
-		for i, block in enumerate(self.blocks):
-			block.id=i+1
-		self.projected_screen = ProjectionScreen(self.camera)
+		if not isinstance(blocks, Scene):
+			blocks = Scene.from_blocks([] if blocks is None else blocks, renumber=True)
+		self.blocks:Scene = blocks
 		self.bg_color = BG
+		self.stats = RenderStats()
+		# see `cache.RenderCache`. Columns from `rasterize` and frames from `render_frame` are looked up here first
+		self.cache:Optional["RenderCache"] = None
+
+	@property
+	def precision(self) -> Precision:
+		return self.camera.precision
+
+	@property
+	def projected_screen(self) -> ProjectionScreen:
+		return self.camera.projected_screen
+
+	def cull(self, x:NDArray[np.float64], y:NDArray[np.float64], height:NDArray[np.float64]) -> NDArray[np.bool_]:
+		'''
+		Which blocks can possibly be seen: in front of the camera and overlapping the wedge between y = -mx and y = mx.
+		Everything this rejects would project to nothing anyway, it just never gets that far.
+
+		`x` and `y` are relative to the camera (see `to_camera_space`).
+		'''
+		m = float(self.projected_screen.top) / float(self.projected_screen.x)
+		return in_wedge(x, y, height, m)
+
+	def in_view(self, block:Block) -> bool:
+		x = np.array([float(block.x - self.camera.x)])
+		y = np.array([float(block.y - self.camera.y)])
+		return bool(self.cull(x, y, np.array([float(block.height)]))[0])
 
-	def retrieve_block_from_id(self, block_id:int):
-		for block in self.blocks:
-			if block.id == block_id:
-				return block
-		raise NotFounderror
-				
+	def retrieve_block_from_id(self, block_id:int) -> BlockView:
+		return self.blocks.view(block_id)
 
-	def get_all_vectors(self, blocks:Optional[List[Block]]) -> List[Vec]:
+	def get_all_vectors(self, blocks:Optional[Sequence[Block]|Scene]) -> List[Vec]:
 		blocks = self.blocks if blocks is None else blocks
 		return [block.vector for block in blocks]
 
 	def get_rendered_block(self,block:Block):
-		scale_factor = self.projected_screen.x / block.x # (y_p = m x_p) / (y_b = m x_b) and so the Ms cancel
-		new_y = scale_factor*block.y
+		x = block.x - self.camera.x
+		scale_factor = self.projected_screen.x / x # (y_p = m x_p) / (y_b = m x_b) and so the Ms cancel
+		new_y = scale_factor*(block.y - self.camera.y)
 		new_height = scale_factor*block.height
-		new_block = Block(block.x, new_y, new_height) # the x doesn't matter
+		new_block = Block(x, new_y, new_height) # the x doesn't matter
 		return new_block
 
 	def trim_out_of_view(self, block:Block):
@@ -162,13 +800,15 @@ class Renderer:
 			ranges.append(ContinuousRange(new_range_start, new_range_end))
 		return ranges
 
-	def find_projected_partition(self, y_position:float, partitions:List[ContinuousRange]) -> int:
+	def find_projected_partition(self, y_position:float, partitions:List[ContinuousRange]|Partitions) -> int:
+		if isinstance(partitions, Partitions):
+			return partitions.find(y_position)
 		for i, partition in enumerate(partitions):
 			if y_position in partition:
 				return i
 		raise OutOfRangeError("Object is outside the screen and could not be mapped")
 
-	def project_onto_screen(self, ranges:List[ContinuousRange], block:Block) -> List[int]:
+	def project_onto_screen(self, ranges:List[ContinuousRange]|Partitions, block:Block) -> List[int]:
 		'''
 		Projects the block onto the quantized screen by returning all the partitions that have a value
 		'''
@@ -188,29 +828,459 @@ class Renderer:
 
 	def generate_position_vector(self, block:Block, dimension:Optional[int]=None) -> Vec:
 		dimension = 5 if dimension is None else dimension
+		if not self.in_view(block):
+			return SpanVector.empty(dimension, self.bg_color)
 		rendered_block = self.get_rendered_block(block)
 		self.trim_out_of_view(rendered_block)
 		self.normalize(rendered_block)
-		ranges = self.quantize(dimension)
+		ranges = get_partitions(dimension)
 		active_partitions = self.project_onto_screen(ranges, rendered_block)
-		vector = self.create_vector_from_partitions(active_partitions, dimension, block.color)
-		return vector
+		return self.create_span_from_partitions(active_partitions, dimension, block.color)
+
+	def create_span_from_partitions(self, active_partition_indices:Sequence[int], dimension:int, color:Color) -> SpanVector:
+		'''
+		`create_vector_from_partitions` without building the list. The active partitions are always contiguous.
+		'''
+		if not active_partition_indices:
+			return SpanVector.empty(dimension, self.bg_color)
+		return SpanVector(active_partition_indices[0], active_partition_indices[-1], color, dimension, self.bg_color)
 	
 
-	def generate_color_vector(self, blocks:List[Block],dim:int) -> Vec:
-		final_vec = [self.bg_color]*dim
-		sorted_blocks = sorted(blocks, key=lambda block: block.x, reverse=True)
-		for i in range(dim):
-			for block in sorted_blocks:
-				if block.vector[i] != self.bg_color:
-					final_vec[i] = block.color
-		return final_vec[::-1]
+	def palette(self, colors:NDArray[np.uint8]) -> NDArray[np.uint8]:
+		'''
+		block colours with the background appended, so a color index of -1 (nothing there) picks `bg_color`.
+		'''
+		return np.vstack([colors.reshape(-1, 3), np.array(self.bg_color, dtype=np.uint8)])
+
+	def shown(self, colors:NDArray[np.uint8]) -> NDArray[np.bool_]:
+		'''
+		which of `colors` get drawn at all. A block painted `bg_color` is transparent, as it always has been
+		in `generate_color_vector`, so the fast paths leave it out before compositing.
+		'''
+		return np.any(colors.reshape(-1, 3) != np.array(self.bg_color, dtype=np.uint8), axis=1)
+
+	def composite(
+			self,
+			bottoms:NDArray[np.int64],
+			tops:NDArray[np.int64],
+			depths:NDArray[np.float64],
+			colors:NDArray[np.uint8],
+			resolution:int,
+			out:Optional[NDArray[np.uint8]]=None
+		) -> NDArray[np.uint8]:
+		'''
+		Depth buffer compositing. Every block paints its `[bottom, top]` slice span wherever it is at least
+		as near (smaller x) as what is already there, so the nearest block wins and ties go to the later block.
+
+		returns a `(resolution, 3)` uint8 column, top of the screen first.
+		'''
+		nearest = np.full(resolution, np.inf)
+		color_index = np.full(resolution, -1, dtype=np.intp)
+		for i in range(len(depths)):
+			span = slice(bottoms[i], tops[i]+1)
+			nearer = depths[i] <= nearest[span]
+			nearest[span][nearer] = depths[i]
+			color_index[span][nearer] = i
+		return np.take(self.palette(colors), color_index[::-1], axis=0, out=out)
+
+	def composite_spans(
+			self,
+			bottoms:NDArray[np.int64],
+			tops:NDArray[np.int64],
+			depths:NDArray[np.float64],
+			colors:NDArray[np.uint8],
+			resolution:int,
+			out:Optional[NDArray[np.uint8]]=None
+		) -> NDArray[np.uint8]:
+		'''
+		Same result as `composite`, but sweeps the span edges bottom to top with a heap of the spans
+		currently open, ordered nearest first (then latest). The colour only changes at an edge, so this is
+		O(blocks log blocks) for the sweep plus one O(resolution) fill, however long or overlapping the spans are.
+		'''
+		order = np.argsort(bottoms, kind="stable")
+		edges = np.unique(np.concatenate(([0, resolution], bottoms, tops + 1)))
+		edges = edges[(edges >= 0) & (edges <= resolution)]
+		winners = np.empty(len(edges) - 1, dtype=np.intp)
+
+		open_spans:List[Tuple[float,int,int]] = []
+		next_span = 0
+		for k, edge in enumerate(edges[:-1].tolist()):
+			while next_span < len(order) and bottoms[order[next_span]] <= edge:
+				i = int(order[next_span])
+				heapq.heappush(open_spans, (float(depths[i]), -i, int(tops[i])))
+				next_span += 1
+			while open_spans and open_spans[0][2] < edge:
+				heapq.heappop(open_spans)
+			winners[k] = -open_spans[0][1] if open_spans else -1
+
+		color_index = np.repeat(winners, np.diff(edges))
+		return np.take(self.palette(colors), color_index[::-1], axis=0, out=out)
+
+	def composite_front_to_back(
+			self,
+			bottoms:NDArray[np.int64],
+			tops:NDArray[np.int64],
+			depths:NDArray[np.float64],
+			colors:NDArray[np.uint8],
+			resolution:int,
+			out:Optional[NDArray[np.uint8]]=None
+		) -> NDArray[np.uint8]:
+		'''
+		Same result as `composite`, working nearest block first. The slices nobody has painted yet are kept as a
+		sorted list of intervals: a block only paints the parts of its span still in that list, a block whose span
+		is already all covered costs one bisect, and once the list is empty the remaining blocks aren't looked at.
+
+		The number of blocks skipped as hidden is added to `stats.occluded`.
+		'''
+		color_index = np.full(resolution, -1, dtype=np.intp)
+		uncovered_starts:List[int] = [0]
+		uncovered_stops:List[int] = [resolution - 1]
+		# nearest first, and for equal depths the later block first since it wins ties
+		order = np.lexsort((-np.arange(len(depths)), depths))
+		occluded = 0
+		for k, i in enumerate(order.tolist()):
+			if not uncovered_starts:
+				# every slice is painted, so everything further back is hidden
+				occluded += len(order) - k
+				break
+			bottom, top = int(bottoms[i]), int(tops[i])
+			first = bisect_left(uncovered_stops, bottom)
+			last = first
+			leftovers:List[Tuple[int,int]] = []
+			while last < len(uncovered_starts) and uncovered_starts[last] <= top:
+				start, stop = uncovered_starts[last], uncovered_stops[last]
+				color_index[max(start, bottom):min(stop, top)+1] = i
+				if start < bottom:
+					leftovers.append((start, bottom - 1))
+				if stop > top:
+					leftovers.append((top + 1, stop))
+				last += 1
+			if last == first:
+				occluded += 1
+				continue
+			uncovered_starts[first:last] = [start for start, _ in leftovers]
+			uncovered_stops[first:last] = [stop for _, stop in leftovers]
+
+		self.stats.occluded += occluded
+		return np.take(self.palette(colors), color_index[::-1], axis=0, out=out)
+
+	def composite_vectorized(
+			self,
+			bottoms:NDArray[np.int64],
+			tops:NDArray[np.int64],
+			depths:NDArray[np.float64],
+			colors:NDArray[np.uint8],
+			resolution:int,
+			out:Optional[NDArray[np.uint8]]=None
+		) -> NDArray[np.uint8]:
+		'''
+		Same result as `composite`, in a handful of array operations. Blocks are ranked by who wins a shared
+		slice (nearest, then latest), every span is expanded into its slices and each slice keeps its best rank.
+		Costs memory and time in proportion to the total length of all spans.
+		'''
+		count = len(depths)
+		color_index = np.full(resolution, -1, dtype=np.intp)
+		if count:
+			lengths = tops - bottoms + 1
+			order = np.lexsort((-np.arange(count), depths))
+			rank = np.empty(count, dtype=np.intp)
+			rank[order] = np.arange(count)
+			span_starts = np.cumsum(lengths) - lengths
+			slices = np.arange(int(lengths.sum())) - np.repeat(span_starts - bottoms, lengths)
+			best = np.full(resolution, count, dtype=np.intp)
+			np.minimum.at(best, slices, np.repeat(rank, lengths))
+			covered = best < count
+			color_index[covered] = order[best[covered]]
+		return np.take(self.palette(colors), color_index[::-1], axis=0, out=out)
+
+	def generate_color_vector(self, blocks:Sequence[Block]|Scene,dim:int) -> Vec:
+		vectors = [block.vector for block in blocks]
+		if all(isinstance(vector, SpanVector) for vector in vectors):
+			# runs only, so composite them directly instead of walking every slice of every vector
+			spans = cast(List[SpanVector], vectors)
+			# a run painted in the background colour is indistinguishable from no run in a dense vector
+			shown = [i for i, span in enumerate(spans) if not span.is_empty and span.color != self.bg_color]
+			column = self.composite_spans(
+				np.array([spans[i].start for i in shown], dtype=np.int64),
+				np.array([spans[i].stop for i in shown], dtype=np.int64),
+				np.array([float(blocks[i].x) for i in shown], dtype=np.float64),
+				np.array([blocks[i].color for i in shown], dtype=np.uint8),
+				dim
+			)
+			return [tuple(pixel) for pixel in column.tolist()]
+
+		nearest = np.full(dim, np.inf)
+		color_index = np.full(dim, -1, dtype=np.intp)
+		bg_color = np.array(self.bg_color)
+		for i, block in enumerate(blocks):
+			covered = np.any(np.asarray(block.vector) != bg_color, axis=1)
+			nearer = covered & (float(block.x) <= nearest)
+			nearest[nearer] = float(block.x)
+			color_index[nearer] = i
+		colors = np.array([block.color for block in blocks], dtype=np.uint8)
+		column = self.palette(colors)[color_index[::-1]]
+		return [tuple(pixel) for pixel in column.tolist()]
+
+	def project_spans(self, blocks:Sequence[Block]|Scene, resolution:int) -> Tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+		'''
+		Batched version of `get_rendered_block` -> `trim_out_of_view` -> `normalize` -> `project_onto_screen`.
+
+		returns the bottommost and topmost partition index of every block, and a mask of which blocks
+		are on screen at all (the ones `project_onto_screen` would return `[]` for are masked out).
+		'''
+		scene = as_scene(blocks)
+		x, y = to_camera_space(scene, self.camera.position)
+		return self.project_columns(x, y, scene.height, resolution)
+
+	def project_columns(self, x:NDArray[np.float64], y:NDArray[np.float64], height:NDArray[np.float64], resolution:int) -> Tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.bool_]]:
+		'''
+		`project_spans` on bare coordinate arrays, with `x` and `y` relative to the camera.
+		'''
+		screen = self.projected_screen
+		return project_onto_partitions(x, y, height, float(screen.x), float(screen.top), float(screen.bottom), float(screen.height), resolution)
+
+	def rasterize(
+			self,
+			blocks:Optional[Sequence[Block]|Scene]=None,
+			resolution:Optional[int]=None,
+			out:Optional[NDArray[np.uint8]]=None,
+			index:Optional[ViewIndex]=None,
+			compositor:Compositor=Compositor.SWEEP
+		) -> NDArray[np.uint8]:
+		'''
+		Renders straight into a `(resolution, 3)` uint8 column, top of the screen first
+		(the same orientation as `generate_color_vector`). No per-block vectors are built.
+
+		`index`: a `ViewIndex` of `blocks`, so only blocks in view are looked at instead of culling every block.
+				 Ignored if it was built for a different camera position.
+		`compositor`: see `Compositor`. `FRONT_TO_BACK` pays off for dense scenes where most blocks are hidden.
+		Counts of what was culled and drawn end up in `stats`.
+		'''
+		blocks = self.blocks if blocks is None else blocks
+		resolution = 1000 if resolution is None else resolution
+		column = np.empty((resolution, 3), dtype=np.uint8) if out is None else out
+		if self.cache is None:
+			return self.rasterize_uncached(blocks, resolution, column, index, compositor)
+
+		from cache import render_key
+		key = render_key(blocks, self.camera, self.bg_color, resolution)
+		cached = self.cache.get(key)
+		if cached is not None:
+			self.stats = RenderStats(blocks=len(blocks))
+			column[:] = cached
+			return column
+		self.rasterize_uncached(blocks, resolution, column, index, compositor)
+		self.cache.put(key, column)
+		return column
+
+	def rasterize_uncached(
+			self,
+			blocks:Sequence[Block]|Scene,
+			resolution:int,
+			column:NDArray[np.uint8],
+			index:Optional[ViewIndex],
+			compositor:Compositor
+		) -> NDArray[np.uint8]:
+		column[:] = self.bg_color
+		self.stats = RenderStats(blocks=len(blocks))
+		if not len(blocks):
+			return column
+		if self.precision is Precision.REFERENCE:
+			with profiling.stage("project"):
+				for block in blocks:
+					block.vector = self.generate_position_vector(block, resolution)
+			with profiling.stage("composite"):
+				column[:] = self.generate_color_vector(blocks, resolution)
+			return column
+
+		bottoms, tops, depths, colors = self.project_visible(as_scene(blocks), resolution, index)
+		with profiling.stage("composite"):
+			return self.compositor(compositor)(bottoms, tops, depths, colors, resolution, out=column)
+
+	def compositor(self, compositor:Compositor):
+		return {
+			Compositor.DEPTH_BUFFER: self.composite,
+			Compositor.SWEEP: self.composite_spans,
+			Compositor.FRONT_TO_BACK: self.composite_front_to_back,
+			Compositor.VECTORIZED: self.composite_vectorized,
+		}[compositor]
+
+	def project_visible(
+			self,
+			scene:Scene,
+			resolution:int,
+			index:Optional[ViewIndex]=None
+		) -> Tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.float64], NDArray[np.uint8]]:
+		'''
+		Culls and projects `scene`, filling in `stats`.
+
+		returns the bottom and top slice, depth and colour of every block that lands on screen, in scene order.
+		'''
+		with profiling.stage("cull"):
+			# panning is one offset over the whole scene, the blocks themselves never move
+			x, y = to_camera_space(scene, self.camera.position)
+			if index is None or index.origin != self.camera.position:
+				candidates = np.flatnonzero(self.cull(x, y, scene.height))
+			else:
+				candidates = index.visible_rows(float(self.projected_screen.top) / float(self.projected_screen.x))
+		x, y = x[candidates], y[candidates]
+		bottoms, tops, visible = self.project_columns(x, y, scene.height[candidates], resolution)
+		visible &= self.shown(scene.color[candidates])
+		rows = candidates[visible]
+		self.stats.culled = len(scene) - len(candidates)
+		self.stats.projected = len(candidates)
+		self.stats.visible = len(rows)
+		return bottoms[visible], tops[visible], x[visible], scene.color[rows]
+
+	def rasterize_runs(
+			self,
+			blocks:Optional[Sequence[Block]|Scene]=None,
+			resolution:Optional[int]=None,
+			index:Optional[ViewIndex]=None,
+			compositor:Compositor=Compositor.SWEEP
+		) -> ColumnRuns:
+		'''
+		`rasterize` without ever touching the slices in between block edges. Between two neighbouring span edges
+		the same blocks cover every slice, so the edges cut the column into cells that are each one colour.
+		Those cells are composited as if each were a single slice, which costs the same however fine `resolution` is.
+
+		returns the same column as `rasterize`, as `ColumnRuns`.
+		'''
+		blocks = self.blocks if blocks is None else blocks
+		resolution = 1000 if resolution is None else resolution
+		if self.precision is Precision.REFERENCE or not len(blocks):
+			return ColumnRuns.from_column(self.rasterize(blocks, resolution, index=index, compositor=compositor))
+
+		self.stats = RenderStats(blocks=len(blocks))
+		bottoms, tops, depths, colors = self.project_visible(as_scene(blocks), resolution, index)
+		with profiling.stage("composite"):
+			return ColumnRuns(*self.composite_cells(bottoms, tops, depths, colors, resolution, compositor=compositor), resolution)
+
+	def composite_cells(
+			self,
+			bottoms:NDArray[np.int64],
+			tops:NDArray[np.int64],
+			depths:NDArray[np.float64],
+			colors:NDArray[np.uint8],
+			resolution:int,
+			low:int=0,
+			high:Optional[int]=None,
+			compositor:Compositor=Compositor.SWEEP
+		) -> Tuple[NDArray[np.int64], NDArray[np.uint8]]:
+		'''
+		Composites slices `low` to `high` (inclusive, counted from the bottom) one cell between span edges at a time.
+
+		returns the start (counted from the top, as in `ColumnRuns`) and colour of every cell, top first.
+		'''
+		high = resolution - 1 if high is None else high
+		bottoms = np.maximum(bottoms, low)
+		tops = np.minimum(tops, high)
+		edges = np.unique(np.concatenate(([low, high + 1], bottoms, tops + 1)))
+		cell_colors = self.compositor(compositor)(
+			np.searchsorted(edges, bottoms), np.searchsorted(edges, tops + 1) - 1, depths, colors, len(edges) - 1
+		)
+		# cells come out top first, so their starts count down from the top of the column
+		return resolution - edges[:0:-1], cell_colors
+
+	def rasterize_batch(
+			self,
+			scenes:Optional[Sequence[Sequence[Block]|Scene]]=None,
+			cameras:Optional[Sequence[Camera]]=None,
+			resolution:Optional[int]=None,
+			compositor:Compositor=Compositor.VECTORIZED,
+			max_slices:int=2**22
+		) -> NDArray[np.uint8]:
+		'''
+		Renders many variants at once: a scene per camera, the same scene through every camera, or every scene
+		through the same camera (this renderer's scene and camera fill in whichever isn't given).
+		All variants are culled and projected together in one pass over their combined blocks, then composited
+		side by side in chunks of at most `max_slices` slices, which bounds the compositor's scratch memory.
+
+		returns a `(variants, resolution, 3)` uint8 array, each column the same as `rasterize` gives for that variant.
+		No scenes or no cameras give no variants.
+		'''
+		resolution = 1000 if resolution is None else resolution
+		scene_list = [self.blocks] if scenes is None else [as_scene(scene) for scene in scenes]
+		camera_list = [self.camera] if cameras is None else list(cameras)
+		if not scene_list or not camera_list:
+			return np.empty((0, resolution, 3), dtype=np.uint8)
+		count = max(len(scene_list), len(camera_list))
+		if len(scene_list) not in (1, count) or len(camera_list) not in (1, count):
+			raise ValueError(f"can't pair up {len(scene_list)} scenes with {len(camera_list)} cameras")
+		columns = np.empty((count, resolution, 3), dtype=np.uint8)
+		columns[:] = self.bg_color
+
+		if any(camera.precision is Precision.REFERENCE for camera in camera_list):
+			for i in range(count):
+				renderer = Renderer(scene_list[i % len(scene_list)], camera_list[i % len(camera_list)])
+				renderer.bg_color = self.bg_color
+				renderer.rasterize(resolution=resolution, out=columns[i])
+			return columns
+
+		# every variant's blocks end to end, with the variant each row belongs to
+		if len(scene_list) == 1:
+			scene = scene_list[0]
+			sizes = np.full(count, len(scene))
+			x, y, height, color = np.tile(scene.x, count), np.tile(scene.y, count), np.tile(scene.height, count), np.tile(scene.color, (count, 1))
+		else:
+			sizes = np.array([len(scene) for scene in scene_list])
+			x = np.concatenate([scene.x for scene in scene_list])
+			y = np.concatenate([scene.y for scene in scene_list])
+			height = np.concatenate([scene.height for scene in scene_list])
+			color = np.concatenate([scene.color for scene in scene_list]).reshape(-1, 3)
+		variant = np.repeat(np.arange(count), sizes)
+		camera_x = np.array([float(camera.x) for camera in camera_list])
+		camera_y = np.array([float(camera.y) for camera in camera_list])
+		camera_m = np.array([float(camera.m) for camera in camera_list])
+		if len(camera_list) == 1:
+			camera_x, camera_y, camera_m = np.full(count, camera_x[0]), np.full(count, camera_y[0]), np.full(count, camera_m[0])
+		self.stats = RenderStats(blocks=len(x))
+
+		with profiling.stage("cull"):
+			x = x - camera_x[variant]
+			y = y - camera_y[variant]
+			m = camera_m[variant]
+			candidates = np.flatnonzero(in_wedge(x, y, height, m))
+		bottoms, tops, visible = project_onto_partitions(
+			x[candidates], y[candidates], height[candidates], *ProjectionScreen.edges(m[candidates]), resolution
+		)
+		visible &= self.shown(color[candidates])
+		rows = candidates[visible]
+		bottoms, tops = bottoms[visible], tops[visible]
+		self.stats.culled = len(x) - len(candidates)
+		self.stats.projected = len(candidates)
+		self.stats.visible = len(rows)
+
+		composite = self.compositor(compositor)
+		chunk = max(1, max_slices // resolution)
+		with profiling.stage("composite"):
+			for first in range(0, count, chunk):
+				last = min(first + chunk, count)
+				# rows are in variant order, so each chunk's rows are one contiguous run
+				low, high = np.searchsorted(variant[rows], [first, last])
+				chunk_rows = rows[low:high]
+				# one long column of the chunk's slices side by side. Flipping it top first also reverses the variants
+				offsets = (variant[chunk_rows] - first) * resolution
+				stacked = composite(
+					offsets + bottoms[low:high], offsets + tops[low:high], x[chunk_rows], color[chunk_rows], (last - first) * resolution
+				)
+				columns[first:last] = stacked.reshape(last - first, resolution, 3)[::-1]
+		return columns
 
 	def generate_all_position_vectors(self, resolution:Optional[int]=None) -> None:
 		resolution = 1000 if resolution is None else resolution
-		for block in self.blocks:
-			vector = self.generate_position_vector(block, resolution)
-			block.vector = vector
+		if not len(self.blocks):
+			return
+		if self.precision is Precision.REFERENCE:
+			for block in self.blocks:
+				block.vector = self.generate_position_vector(block, resolution)
+			return
+		bottoms, tops, visible = self.project_spans(self.blocks, resolution)
+		for i, block in enumerate(self.blocks):
+			if visible[i]:
+				block.vector = SpanVector(int(bottoms[i]), int(tops[i]), block.color, resolution, self.bg_color)
+			else:
+				block.vector = SpanVector.empty(resolution, self.bg_color)
 
 	# def combine_vectors(self, blocks:Optional[List[Block]]=None) -> List[Tuple[int,int,int]]:
 	# 	#TODO: include colours
@@ -219,24 +1289,292 @@ class Renderer:
 	# 	result_vector = sum(vectors, [self.bg_color]*len(vectors[0]))
 	# 	return result_vector
 
-	def generate_image(self, blocks, image_size:Optional[Tuple[int,int]]=None) -> Image.Image:
+	def generate_image(self, blocks, image_size:Optional[Tuple[int,int]]=None) -> "Image.Image":
 		# At each level along all vectors, see which is closest to the screen
 		# then set the colour for that pixel to the frontmost colour.
 		image_size = (100,500) if image_size is None else image_size
 		vectors = self.get_all_vectors(blocks)
 		dimension = len(vectors[0])
 
-		initial_image = Image.new(mode="RGB",size=(1, dimension))
+		color_map = np.array(self.generate_color_vector(blocks, dimension), dtype=np.uint8)
+		return self.generate_image_from_column(color_map, image_size)
 
-		color_map = self.generate_color_vector(blocks, dimension)
-		initial_image.putdata(list(color_map)) #type: ignore (it's pedantic cuz PIL is vague)
+	def resample_column(self, column:NDArray[np.uint8]|ColumnRuns, height:int, resample:Resample=Resample.NEAREST) -> NDArray[np.uint8]:
+		'''
+		Scales a column to `height` rows. The index maps are cached per (resolution, height),
+		so across the frames of an animation only the gather itself runs.
+		Also takes a stack of columns, `(..., resolution, 3)`, from `rasterize_batch`, or `ColumnRuns`.
+		'''
+		if isinstance(column, ColumnRuns):
+			return self.resample_runs(column, height, resample)
+		dimension = column.shape[-2]
+		if resample is Resample.NEAREST:
+			return column[..., get_nearest_rows(dimension, height), :]
 
-		rescaled_image = initial_image.resize((image_size[0],image_size[1]), resample=Image.Resampling.NEAREST)
-		
-		return rescaled_image
+		slices, fractions, row_width = get_area_kernel(dimension, height)
+		# running sum up to each row edge, then each row is the difference between its two edges
+		running_sum = np.zeros(column.shape[:-2] + (dimension + 1, 3))
+		np.cumsum(column, axis=-2, out=running_sum[..., 1:, :])
+		at_edges = running_sum[..., slices, :] + fractions[:, np.newaxis] * column[..., slices, :]
+		averages = (at_edges[..., 1:, :] - at_edges[..., :-1, :]) / row_width
+		return np.clip(np.rint(averages), 0, 255).astype(np.uint8)
+
+	def resample_runs(self, runs:ColumnRuns, height:int, resample:Resample=Resample.NEAREST) -> NDArray[np.uint8]:
+		'''
+		`resample_column` straight from runs, giving exactly the same rows as from the dense column.
+		Only the slices the rows actually sample are looked up, so this costs nothing per slice.
+		'''
+		dimension = runs.resolution
+		if resample is Resample.NEAREST:
+			return runs.colors[runs.run_at(get_nearest_rows(dimension, height))]
+
+		slices, fractions, row_width = get_area_kernel(dimension, height)
+		run = runs.run_at(slices)
+		colors = runs.colors[run]
+		# the dense running sum at a slice is the sum of every run before its own plus its own colour up to it,
+		# all whole numbers, so it comes out exactly the same
+		run_sums = np.zeros((len(runs.starts) + 1, 3))
+		np.cumsum(runs.colors * runs.lengths[:, np.newaxis], axis=0, out=run_sums[1:])
+		running_sum = run_sums[run] + colors * (slices - runs.starts[run])[:, np.newaxis]
+		at_edges = running_sum + fractions[:, np.newaxis] * colors
+		averages = (at_edges[1:] - at_edges[:-1]) / row_width
+		return np.clip(np.rint(averages), 0, 255).astype(np.uint8)
+
+	def generate_frame(self, column:NDArray[np.uint8]|ColumnRuns, image_size:Optional[Tuple[int,int]]=None, out:Optional[NDArray[np.uint8]]=None, resample:Resample=Resample.NEAREST) -> NDArray[np.uint8]:
+		'''
+		Upscales a column straight into a `(height, width, 3)` uint8 array. Every row of a frame is one colour,
+		so this is a single gather along the column broadcast across the width.
+		'''
+		image_size = (100,500) if image_size is None else image_size
+		width, height = image_size
+		with profiling.stage("upscale"):
+			frame = np.empty((height, width, 3), dtype=np.uint8) if out is None else out
+			frame[:] = self.resample_column(column, height, resample)[:, np.newaxis, :]
+		return frame
+
+	def generate_frames(self, columns:NDArray[np.uint8], image_size:Optional[Tuple[int,int]]=None, resample:Resample=Resample.NEAREST) -> NDArray[np.uint8]:
+		'''
+		`generate_frame` for every column from `rasterize_batch` at once, as a `(variants, height, width, 3)` uint8 array.
+		'''
+		image_size = (100,500) if image_size is None else image_size
+		width, height = image_size
+		with profiling.stage("upscale"):
+			frames = np.empty((len(columns), height, width, 3), dtype=np.uint8)
+			frames[:] = self.resample_column(columns, height, resample)[:, :, np.newaxis, :]
+		return frames
+
+	def save_frames(self, frames:NDArray[np.uint8], directory:str, name:str="{index:05d}.png") -> List[str]:
+		'''
+		Writes every frame from `generate_frames` into `directory` (created if needed), named by `name.format(index=...)`.
+
+		returns the paths written.
+		'''
+		import os
+		from PIL import Image
+		os.makedirs(directory, exist_ok=True)
+		paths:List[str] = []
+		with profiling.stage("to_image"):
+			for index, frame in enumerate(frames):
+				path = os.path.join(directory, name.format(index=index))
+				Image.fromarray(frame).save(path)
+				paths.append(path)
+		return paths
+
+	def generate_image_from_column(self, column:NDArray[np.uint8], image_size:Optional[Tuple[int,int]]=None) -> "Image.Image":
+		from PIL import Image
+		frame = self.generate_frame(column, image_size)
+		with profiling.stage("to_image"):
+			return Image.fromarray(frame)
+
+	def render_frame(self, image_size:Optional[Tuple[int,int]]=None, resolution:Optional[int]=None, resample:Resample=Resample.NEAREST) -> NDArray[np.uint8]:
+		'''
+		`rasterize` and `generate_frame` in one, going through `cache` as a whole if there is one.
+		'''
+		image_size = (100,500) if image_size is None else image_size
+		resolution = 1000 if resolution is None else resolution
+		if self.cache is None:
+			return self.generate_frame(self.rasterize(resolution=resolution), image_size, resample=resample)
+
+		from cache import render_key
+		key = render_key(self.blocks, self.camera, self.bg_color, resolution, image_size, resample)
+		frame = self.cache.get(key)
+		if frame is None:
+			frame = self.generate_frame(self.rasterize(resolution=resolution), image_size, resample=resample)
+			frame = self.cache.put(key, frame, copy=False)
+		return frame
 
 	def render(self, image_size:Optional[Tuple[int,int]]=None):
-		self.generate_all_position_vectors()
-		self.generate_image(self.blocks, image_size).show()
+		from PIL import Image
+		Image.fromarray(self.render_frame(image_size)).show()
+
+
+
+def merge_intervals(intervals:List[Tuple[int,int]]) -> List[Tuple[int,int]]:
+	'''
+	Merges overlapping or touching inclusive `(low, high)` intervals.
+	'''
+	merged:List[Tuple[int,int]] = []
+	for low, high in sorted(intervals):
+		if merged and low <= merged[-1][1] + 1:
+			merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+		else:
+			merged.append((low, high))
+	return merged
+
+
+class ColumnBuffer:
+	'''
+	A rendered column kept together with the depth buffer behind it and every block's projected span,
+	so moving a few blocks only re-projects those blocks and re-composites the slices their old and new spans cover.
+
+	Spans are cached against each block's geometry and colour (the resolution is fixed per buffer),
+	so static blocks are projected once for the lifetime of the buffer. Moving or zooming the camera
+	re-projects everything in one batch and repaints the whole column.
+	'''
+	def __init__(self, renderer:Renderer, blocks:Sequence[Block]|Scene, resolution:int) -> None:
+		self.renderer = renderer
+		self.scene = as_scene(blocks)
+		self.resolution = resolution
+		count = len(self.scene)
+		# geometry each span was projected from, NaN until the first update so everything starts stale
+		self.projected_x:NDArray[np.float64] = np.full(count, np.nan)
+		self.projected_y:NDArray[np.float64] = np.full(count, np.nan)
+		self.projected_height:NDArray[np.float64] = np.full(count, np.nan)
+		self.colors:NDArray[np.uint8] = np.zeros((count, 3), dtype=np.uint8)
+		# camera position and theta the spans were projected with
+		self.view:Optional[Tuple[float,float,float]] = None
+		self.depths:NDArray[np.float64] = np.zeros(count)
+		self.bottoms:NDArray[np.int64] = np.zeros(count, dtype=np.int64)
+		self.tops:NDArray[np.int64] = np.zeros(count, dtype=np.int64)
+		self.visible:NDArray[np.bool_] = np.zeros(count, dtype=np.bool_)
+		self.clear()
+		self.update()
+
+	def clear(self) -> None:
+		self.nearest:NDArray[np.float64] = np.full(self.resolution, np.inf)
+		self.color_index:NDArray[np.intp] = np.full(self.resolution, -1, dtype=np.intp)
+		self.column:NDArray[np.uint8] = np.empty((self.resolution, 3), dtype=np.uint8)
+		self.column[:] = self.renderer.bg_color
+
+	def update(self, changed:Optional[Sequence[int]]=None) -> bool:
+		'''
+		`changed`: rows of the blocks that may have moved. Every block is checked if not given.
+
+		returns whether the column changed.
+		'''
+		scene = self.scene
+		camera = self.renderer.camera
+		view = (camera.x, camera.y, camera.theta)
+		repaint = view != self.view
+		if repaint:
+			self.view = view
+			changed = None
+			self.projected_x[:] = np.nan
+		rows = np.arange(len(scene)) if changed is None else np.asarray(changed, dtype=np.intp)
+		moved = (
+			(scene.x[rows] != self.projected_x[rows])
+			| (scene.y[rows] != self.projected_y[rows])
+			| (scene.height[rows] != self.projected_height[rows])
+			| np.any(scene.color[rows] != self.colors[rows], axis=1)
+		)
+		stale = rows[moved]
+		if not len(stale):
+			return False
+
+		dirty = [(int(self.bottoms[i]), int(self.tops[i])) for i in stale[self.visible[stale]]]
+		self.projected_x[stale] = scene.x[stale]
+		self.projected_y[stale] = scene.y[stale]
+		self.projected_height[stale] = scene.height[stale]
+		self.colors[stale] = scene.color[stale]
+
+		if self.renderer.precision is Precision.REFERENCE:
+			return self.rerender()
+
+		x, y = to_camera_space(scene, camera.position, stale)
+		bottoms, tops, visible = self.renderer.project_columns(x, y, scene.height[stale], self.resolution)
+		self.depths[stale] = x
+		self.bottoms[stale] = bottoms
+		self.tops[stale] = tops
+		self.visible[stale] = visible & self.renderer.shown(scene.color[stale])
+
+		with profiling.stage("composite"):
+			if repaint:
+				return self.repaint()
+
+			dirty += [(int(bottom), int(top)) for bottom, top in zip(bottoms[visible], tops[visible])]
+			palette = self.renderer.palette(self.colors)
+			changed = False
+			for low, high in merge_intervals(dirty):
+				changed |= self.recomposite(low, high, palette)
+			return changed
+
+	def rerender(self) -> bool:
+		'''
+		Renders the whole column again with `Renderer.rasterize`, returning whether it changed.
+		'''
+		previous = self.column.copy()
+		self.renderer.rasterize(self.scene, self.resolution, out=self.column)
+		return not np.array_equal(previous, self.column)
+
+	def repaint(self) -> bool:
+		'''
+		Composites every visible span again, returning whether the column changed.
+		'''
+		previous = self.column.copy()
+		rows = np.flatnonzero(self.visible)
+		self.renderer.composite_spans(self.bottoms[rows], self.tops[rows], self.depths[rows], self.colors[rows], self.resolution, out=self.column)
+		return not np.array_equal(previous, self.column)
+
+	def recomposite(self, low:int, high:int, palette:NDArray[np.uint8]) -> bool:
+		'''
+		Re-runs the depth test for slices `low` to `high` (inclusive) against every block overlapping them.
+
+		returns whether any of their colours changed.
+		'''
+		nearest = self.nearest[low:high+1]
+		color_index = self.color_index[low:high+1]
+		nearest[:] = np.inf
+		color_index[:] = -1
+		overlapping = np.flatnonzero(self.visible & (self.bottoms <= high) & (self.tops >= low))
+		for i in overlapping:
+			span = slice(max(int(self.bottoms[i]), low) - low, min(int(self.tops[i]), high) - low + 1)
+			nearer = self.depths[i] <= nearest[span]
+			nearest[span][nearer] = self.depths[i]
+			color_index[span][nearer] = i
+		# the column is stored top first
+		colors = palette[color_index[::-1]]
+		target = self.column[self.resolution-1-high : self.resolution-low]
+		if np.array_equal(target, colors):
+			return False
+		target[:] = colors
+		return True
+
+
+class AdaptiveBuffer(ColumnBuffer):
+	'''
+	`ColumnBuffer` keeping its column as `ColumnRuns` (see `Renderer.rasterize_runs`), so nothing it does
+	scales with the resolution. Moving blocks re-composites only the cells between the span edges their
+	old and new spans cover, and splices those into the runs.
+	'''
+	column:ColumnRuns # type:ignore[assignment]
+
+	def clear(self) -> None:
+		self.column = ColumnRuns(np.zeros(1, dtype=np.int64), np.array([self.renderer.bg_color], dtype=np.uint8), self.resolution)
+
+	def rerender(self) -> bool:
+		previous = self.column
+		self.column = self.renderer.rasterize_runs(self.scene, self.resolution)
+		return self.column != previous
 
+	def repaint(self) -> bool:
+		return self.recomposite(0, self.resolution - 1)
 
+	def recomposite(self, low:int, high:int, palette:Optional[NDArray[np.uint8]]=None) -> bool:
+		previous = self.column
+		rows = np.flatnonzero(self.visible & (self.bottoms <= high) & (self.tops >= low))
+		starts, colors = self.renderer.composite_cells(
+			self.bottoms[rows], self.tops[rows], self.depths[rows], self.colors[rows], self.resolution,
+			low, high, compositor=Compositor.VECTORIZED
+		)
+		self.column = previous.splice(starts, colors, self.resolution - 1 - low)
+		return self.column != previous
@@ -0,0 +1,197 @@
+'''
+Benchmarks for the render and animation paths.
+
+Every combination of the given parameters is rendered and each stage is timed, with results written
+as one JSON object per line so runs from different versions can be diffed. e.g.
+
+	python benchmark.py --blocks 10 500 --overlap 1 4 --quality FAST ACCURATE --frames 60 --output results.jsonl
+'''
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend import Block, Camera, Renderer
+from animator import Animator, RenderQuality
+
+STAGES = ("generate_position_vector", "generate_color_vector", "generate_image", "rasterize", "slide")
+
+
+@dataclass(frozen=True)
+class BenchmarkScene:
+	'''
+	`overlap`: roughly how many blocks cover each slice on average. Every block is sized to cover
+	`overlap / block_count` of the view at its distance.
+	`vector_resolution`: overrides the quality's resolution for the single frame stages.
+	'''
+	block_count:int
+	overlap:float
+	quality:RenderQuality
+	frame_count:int
+	vector_resolution:Optional[int]=None
+	seed:int=0
+
+	@property
+	def resolution(self) -> int:
+		return self.quality.vector_resolution if self.vector_resolution is None else self.vector_resolution
+
+	def make_blocks(self) -> List[Block]:
+		rng = random.Random(self.seed)
+		camera = Camera(forced_screen_height=1)
+		blocks:List[Block] = []
+		for _ in range(self.block_count):
+			x = rng.uniform(1, 6)
+			view_height = 2 * camera.m * x
+			height = view_height * min(1.0, self.overlap / self.block_count)
+			y = rng.uniform(-0.5 * view_height, 0.5 * view_height)
+			color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+			blocks.append(Block(x, y, height, color=color))
+		return blocks
+
+	def describe(self) -> Dict:
+		return {
+			"block_count": self.block_count,
+			"overlap": self.overlap,
+			"quality": self.quality.name,
+			"vector_resolution": self.resolution,
+			"image_resolution": list(self.quality.image_resolution),
+			"frame_count": self.frame_count,
+			"seed": self.seed,
+		}
+
+
+def time_stage(run:Callable[[], object], repeats:int) -> Dict:
+	'''
+	Times `run` `repeats` times, then once more under tracemalloc for its peak Python allocation.
+	'''
+	timings:List[float] = []
+	for _ in range(repeats):
+		start = time.perf_counter()
+		run()
+		timings.append(time.perf_counter() - start)
+
+	tracemalloc.start()
+	try:
+		run()
+		_, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	return {
+		"seconds": statistics.median(timings),
+		"seconds_min": min(timings),
+		"repeats": repeats,
+		"peak_bytes": peak,
+	}
+
+
+def benchmark_stage(scene:BenchmarkScene, stage:str, repeats:int) -> Dict:
+	blocks = scene.make_blocks()
+	renderer = Renderer(blocks=blocks, camera=Camera(forced_screen_height=1))
+	resolution = scene.resolution
+	calls = 1
+
+	if stage == "generate_position_vector":
+		calls = len(blocks)
+		run:Callable[[], object] = lambda: [renderer.generate_position_vector(block, resolution) for block in blocks]
+	elif stage == "generate_color_vector":
+		renderer.generate_all_position_vectors(resolution)
+		run = lambda: renderer.generate_color_vector(renderer.blocks, resolution)
+	elif stage == "generate_image":
+		renderer.generate_all_position_vectors(resolution)
+		run = lambda: renderer.generate_image(renderer.blocks, scene.quality.image_resolution)
+	elif stage == "rasterize":
+		run = lambda: renderer.rasterize(resolution=resolution)
+	elif stage == "slide":
+		calls = scene.frame_count
+		run = lambda: run_slide(scene)
+	else:
+		raise ValueError(f"unknown stage {stage!r}, expected one of {', '.join(STAGES)}")
+
+	result = time_stage(run, repeats)
+	result["calls"] = calls
+	result["per_second"] = calls / result["seconds"] if result["seconds"] > 0 else None
+	return result
+
+
+def run_slide(scene:BenchmarkScene) -> None:
+	'''
+	A full `Animator.slide` of the nearest block across the view, video encoding included, written to a scratch directory.
+	'''
+	blocks = scene.make_blocks()
+	animator = Animator(blocks=blocks)
+	nearest = min(animator.blocks, key=lambda block: block.x)
+	start = (nearest.x, nearest.y)
+	end = (nearest.x, -nearest.y)
+
+	with tempfile.TemporaryDirectory() as scratch:
+		animator.slide(nearest.id, start, end, scene.frame_count, write_path=os.path.join(scratch, "slide.mp4"), quality=scene.quality)
+
+
+def run_benchmarks(scenes:Sequence[BenchmarkScene], stages:Sequence[str]=STAGES, repeats:int=3) -> List[Dict]:
+	environment = {
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"machine": platform.machine(),
+	}
+	results:List[Dict] = []
+	for scene in scenes:
+		for stage in stages:
+			result = {"stage": stage, "scene": scene.describe(), "environment": environment}
+			result.update(benchmark_stage(scene, stage, repeats))
+			results.append(result)
+	return results
+
+
+def main(argv:Optional[Sequence[str]]=None) -> None:
+	parser = argparse.ArgumentParser(description="Time the render and animation paths.")
+	parser.add_argument("--blocks", type=int, nargs="+", default=[5, 100])
+	parser.add_argument("--overlap", type=float, nargs="+", default=[2.0])
+	parser.add_argument("--quality", choices=[quality.name for quality in RenderQuality], nargs="+", default=["FAST"])
+	parser.add_argument("--resolution", type=int, nargs="+", default=[None], help="overrides the quality's vector resolution")
+	parser.add_argument("--frames", type=int, nargs="+", default=[30])
+	parser.add_argument("--stages", choices=STAGES, nargs="+", default=list(STAGES))
+	parser.add_argument("--repeats", type=int, default=3)
+	parser.add_argument("--output", help="write JSON lines here instead of stdout")
+	args = parser.parse_args(argv)
+
+	scenes = [
+		BenchmarkScene(block_count, overlap, RenderQuality[quality], frame_count, resolution)
+		for block_count, overlap, quality, resolution, frame_count
+		in itertools.product(args.blocks, args.overlap, args.quality, args.resolution, args.frames)
+	]
+	results = run_benchmarks(scenes, args.stages, args.repeats)
+
+	lines = "".join(json.dumps(result) + "\n" for result in results)
+	if args.output is None:
+		sys.stdout.write(lines)
+	else:
+		with open(args.output, "w") as output:
+			output.write(lines)
+
+	for result in results:
+		scene = result["scene"]
+		print(
+			f"{result['stage']:<26} blocks={scene['block_count']:<6} overlap={scene['overlap']:<5} "
+			f"res={scene['vector_resolution']:<7} {result['seconds']*1000:10.2f} ms "
+			f"{result['per_second'] or 0:10.1f}/s  peak {result['peak_bytes']/2**20:8.2f} MiB",
+			file=sys.stderr
+		)
+	print(f"max rss {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
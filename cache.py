@@ -0,0 +1,196 @@
+'''
+A content-addressed cache of rendered columns and frames. Entries are keyed by a hash of everything that
+decides what a render looks like (see `render_key`), so the same scene rendered again, in this run or a
+later one, is looked up instead of rendered.
+
+	renderer.cache = RenderCache(directory=".render-cache")
+'''
+
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from backend import Block, Camera, Color, Resample, Scene, as_scene
+
+
+def render_key(
+		blocks:Sequence[Block]|Scene,
+		camera:Camera,
+		bg_color:Color,
+		resolution:int,
+		image_size:Optional[Tuple[int,int]]=None,
+		resample:Optional[Resample]=None
+	) -> str:
+	'''
+	A stable hex digest of the blocks' geometry and colour (in order), the camera, the background colour,
+	the vector resolution and, for frames, the image size and resampling. Block ids don't affect a render, so they're left out.
+	'''
+	scene = as_scene(blocks)
+	digest = blake2b(digest_size=20)
+	for column in (scene.x, scene.y, scene.height):
+		digest.update(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+	digest.update(np.ascontiguousarray(scene.color, dtype=np.uint8).tobytes())
+	settings = (
+		str(camera.x), str(camera.y), str(camera.theta), camera.precision.value,
+		tuple(bg_color), resolution, image_size, None if resample is None else resample.value
+	)
+	digest.update(repr(settings).encode())
+	return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+	'''
+	`hits` were found in memory, `disk_hits` on disk (and are then kept in memory too).
+	`evictions` and `disk_evictions` count entries dropped to stay under each tier's size limit.
+	'''
+	hits:int = 0
+	disk_hits:int = 0
+	misses:int = 0
+	evictions:int = 0
+	disk_writes:int = 0
+	disk_evictions:int = 0
+
+
+class RenderCache:
+	'''
+	An LRU of arrays in memory holding at most `max_bytes`, optionally backed by `.npy` files in `directory`
+	holding at most `max_disk_bytes` (least recently used files go first).
+	Several processes can share a directory: files are written under a temporary name and renamed into place.
+
+	Arrays handed out are shared with the cache, so they're read-only.
+	'''
+	def __init__(self, max_bytes:int=256 * 2**20, directory:Optional[str]=None, max_disk_bytes:int=2 * 2**30) -> None:
+		self.max_bytes = max_bytes
+		self.directory = directory
+		self.max_disk_bytes = max_disk_bytes
+		self.entries:OrderedDict[str, NDArray] = OrderedDict()
+		self.memory_bytes = 0
+		self.disk_bytes = 0
+		self.stats = CacheStats()
+		if directory is not None:
+			os.makedirs(directory, exist_ok=True)
+			self.disk_bytes = sum(size for _, size, _ in self.disk_files())
+
+	def __len__(self) -> int:
+		return len(self.entries)
+
+	def __contains__(self, key:str) -> bool:
+		return key in self.entries or (self.directory is not None and os.path.exists(self.path(key)))
+
+	def path(self, key:str) -> str:
+		assert self.directory is not None
+		return os.path.join(self.directory, key + ".npy")
+
+	def disk_files(self) -> List[Tuple[str, int, float]]:
+		'''
+		path, size and modification time of every cached file. Files another process removes meanwhile are skipped.
+		'''
+		assert self.directory is not None
+		files:List[Tuple[str, int, float]] = []
+		for entry in os.scandir(self.directory):
+			if not entry.name.endswith(".npy"):
+				continue
+			try:
+				stat = entry.stat()
+			except FileNotFoundError:
+				continue
+			files.append((entry.path, stat.st_size, stat.st_mtime))
+		return files
+
+	def get(self, key:str) -> Optional[NDArray]:
+		array = self.entries.get(key)
+		if array is not None:
+			self.entries.move_to_end(key)
+			self.stats.hits += 1
+			return array
+
+		if self.directory is not None:
+			try:
+				array = np.load(self.path(key))
+				# bump it so disk eviction sees it as recently used
+				os.utime(self.path(key))
+			except (FileNotFoundError, ValueError, OSError):
+				array = None
+			if array is not None:
+				self.stats.disk_hits += 1
+				self.remember(key, array)
+				return array
+
+		self.stats.misses += 1
+		return None
+
+	def put(self, key:str, array:NDArray, copy:bool=True) -> NDArray:
+		'''
+		`copy`: pass False to cache `array` itself when nothing else will write to it. It's made read-only either way.
+
+		returns the cached array.
+		'''
+		if copy:
+			array = np.array(array, copy=True)
+		self.remember(key, array)
+		if self.directory is not None:
+			self.write(key, array)
+		return array
+
+	def get_or_render(self, key:str, render:Callable[[], NDArray]) -> NDArray:
+		array = self.get(key)
+		return self.put(key, render()) if array is None else array
+
+	def remember(self, key:str, array:NDArray) -> None:
+		array.flags.writeable = False
+		previous = self.entries.pop(key, None)
+		if previous is not None:
+			self.memory_bytes -= previous.nbytes
+		if array.nbytes > self.max_bytes:
+			return
+		self.entries[key] = array
+		self.memory_bytes += array.nbytes
+		while self.memory_bytes > self.max_bytes:
+			_, evicted = self.entries.popitem(last=False)
+			self.memory_bytes -= evicted.nbytes
+			self.stats.evictions += 1
+
+	def write(self, key:str, array:NDArray) -> None:
+		assert self.directory is not None
+		path = self.path(key)
+		if os.path.exists(path):
+			return
+		handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+		with os.fdopen(handle, "wb") as file:
+			np.save(file, array)
+		os.replace(temporary, path)
+		self.stats.disk_writes += 1
+		self.disk_bytes += os.path.getsize(path)
+		if self.disk_bytes > self.max_disk_bytes:
+			self.evict_disk()
+
+	def evict_disk(self) -> None:
+		files = sorted(self.disk_files(), key=lambda file: file[2])
+		self.disk_bytes = sum(size for _, size, _ in files)
+		for path, size, _ in files:
+			if self.disk_bytes <= self.max_disk_bytes:
+				break
+			try:
+				os.remove(path)
+				self.stats.disk_evictions += 1
+			except FileNotFoundError:
+				pass
+			self.disk_bytes -= size
+
+	def clear(self) -> None:
+		self.entries.clear()
+		self.memory_bytes = 0
+		if self.directory is not None:
+			for path, _, _ in self.disk_files():
+				try:
+					os.remove(path)
+				except FileNotFoundError:
+					pass
+			self.disk_bytes = 0
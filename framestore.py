@@ -0,0 +1,158 @@
+'''
+Rendered frames kept on disk as they're made, so a long render that's interrupted loses at most a few frames
+and can carry on from where it stopped. Encoding to video is then a separate step that reads the frames back.
+
+	with FrameStore.resume("outputs/slide", frame_count=6000, image_size=(300, 1500)) as store:
+		for frame in frames_from(store.completed):
+			store.append(frame)
+
+Frames go into one raw `(frames, height, width, 3)` uint8 file mapped into memory with `np.memmap`,
+next to a manifest recording how many frames, from the first, are safely on disk.
+'''
+
+import json
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+import profiling
+
+MANIFEST = "manifest.json"
+FRAMES = "frames.raw"
+
+
+class FrameStore:
+	'''
+	Frames are appended in order. Every `checkpoint_every` frames the memmap is flushed and then the manifest
+	is rewritten (atomically), so the manifest never counts a frame that isn't on disk.
+
+	`signature`: identifies what's being rendered, so frames from a different render are never resumed from.
+	'''
+	def __init__(
+			self,
+			directory:str,
+			frame_count:int,
+			image_size:Tuple[int,int],
+			signature:str="",
+			completed:int=0,
+			checkpoint_every:int=30,
+			mode:str="r+"
+		) -> None:
+		self.directory = directory
+		self.frame_count = frame_count
+		self.image_size = image_size
+		self.signature = signature
+		self.completed = completed
+		self.checkpoint_every = checkpoint_every
+		self.writable = mode != "r"
+		width, height = image_size
+		shape = (frame_count, height, width, 3)
+		# an empty file can't be mapped
+		self.frames:NDArray[np.uint8] = (
+			np.memmap(self.path(FRAMES), dtype=np.uint8, mode=mode, shape=shape) if frame_count else np.zeros(shape, dtype=np.uint8)
+		)
+
+	@classmethod
+	def open(cls, directory:str) -> "FrameStore":
+		'''
+		Opens an existing store read-only, e.g. to encode it.
+		'''
+		manifest = read_manifest(directory)
+		if manifest is None:
+			raise FileNotFoundError(f"no frames have been recorded in {directory}")
+		return cls(
+			directory, manifest["frame_count"], tuple(manifest["image_size"]), manifest["signature"], manifest["completed"], mode="r" # type:ignore
+		)
+
+	@classmethod
+	def resume(
+			cls,
+			directory:str,
+			frame_count:int,
+			image_size:Tuple[int,int],
+			signature:str="",
+			checkpoint_every:int=30
+		) -> "FrameStore":
+		'''
+		Picks up the store in `directory` if there is one, otherwise makes a new one, with the raw file preallocated.
+		Raises ValueError if the store there was recording something else; remove the directory to start over.
+		'''
+		manifest = read_manifest(directory)
+		if manifest is None:
+			os.makedirs(directory, exist_ok=True)
+			store = cls(directory, frame_count, image_size, signature, checkpoint_every=checkpoint_every, mode="w+")
+			store.write_manifest()
+			return store
+
+		settings = (frame_count, list(image_size), signature)
+		recorded = (manifest["frame_count"], manifest["image_size"], manifest["signature"])
+		if settings != recorded:
+			raise ValueError(f"{directory} holds frames of a different render (frame count, image size and signature {recorded}, not {settings})")
+		return cls(directory, frame_count, image_size, signature, manifest["completed"], checkpoint_every)
+
+	def __enter__(self) -> "FrameStore":
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+	def __len__(self) -> int:
+		return self.completed
+
+	@property
+	def done(self) -> bool:
+		return self.completed == self.frame_count
+
+	@property
+	def completed_frames(self) -> NDArray[np.uint8]:
+		'''
+		Every completed frame, as a view of the memmap.
+		'''
+		return self.frames[:self.completed]
+
+	def path(self, name:str) -> str:
+		return os.path.join(self.directory, name)
+
+	def append(self, frame:NDArray[np.uint8]) -> None:
+		if self.done:
+			raise IndexError(f"all {self.frame_count} frames have already been recorded")
+		with profiling.stage("store", frame=self.completed):
+			self.frames[self.completed] = frame
+			self.completed += 1
+			if self.completed % self.checkpoint_every == 0 or self.done:
+				self.checkpoint()
+
+	def checkpoint(self) -> None:
+		if isinstance(self.frames, np.memmap):
+			self.frames.flush()
+		self.write_manifest()
+
+	def write_manifest(self) -> None:
+		manifest = {
+			"frame_count": self.frame_count,
+			"image_size": list(self.image_size),
+			"signature": self.signature,
+			"completed": self.completed,
+			"frames": FRAMES,
+		}
+		handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+		with os.fdopen(handle, "w") as file:
+			json.dump(manifest, file)
+		os.replace(temporary, self.path(MANIFEST))
+
+	def close(self) -> None:
+		if self.writable:
+			self.checkpoint()
+		# unmaps the file once nothing else holds a view of it
+		self.frames = np.zeros((0,) + self.frames.shape[1:], dtype=np.uint8)
+
+
+def read_manifest(directory:str) -> Optional[Dict]:
+	try:
+		with open(os.path.join(directory, MANIFEST)) as file:
+			return json.load(file)
+	except FileNotFoundError:
+		return None
@@ -0,0 +1,338 @@
+'''
+Renders a batch of animations described in JSON, spread over a pool of worker processes. e.g.
+
+	python jobs.py slides.jsonl --workers 8 --output-dir outputs/batch --report report.jsonl
+
+A spec file holds one job, or a list of them, as JSON, or one job per line as JSON lines. A job looks like
+
+	{
+		"name": "cyan-slide",
+		"blocks": [{"x": 1.726, "y": -0.22, "height": 0.072, "color": [0, 255, 255]}, ...],
+		"camera": {"x": 0, "y": 0, "forced_screen_height": 1},
+		"slide": {"block_id": 1, "start": [1.726, -0.22], "end": [5.4, 0.22], "frame_count": 60},
+		"quality": "FAST",
+		"fps": 30,
+		"output": "cyan.mp4"
+	}
+
+with "timeline" in place of "slide" for keyframed moves of any number of blocks and the camera:
+
+	"timeline": {
+		"frame_count": 60,
+		"keyframes": [{"block_id": 1, "frame": 0, "x": 1.7, "y": 0}, {"block_id": 1, "frame": 59, "x": 3, "y": 0.2, "easing": "ease_in"}],
+		"camera_keyframes": [{"frame": 0, "x": 0, "y": 0}, {"frame": 59, "x": 0.5, "y": 0}]
+	}
+
+Block ids are one-indexed positions in "blocks", as everywhere else. Only "blocks" and "slide" or "timeline" are required.
+
+Every job gets its own output file: "output" (relative to the output directory), or `<name>.mp4`.
+Names can't contain path separators or "..", and outputs can't resolve to anywhere outside the output directory.
+Two jobs writing to the same file is an error. Videos are written under a temporary name and only renamed
+into place once complete, so a job that fails never leaves a finished-looking file behind.
+
+A camera without "theta" has `forced_screen_height` 1, the same as leaving "camera" out.
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from animator import Animator, RenderQuality
+from backend import Block, Camera
+from timeline import Easing, Timeline
+
+
+class JobError(Exception): ...
+
+
+@dataclass
+class Job:
+	'''
+	`index`: where the job was in the batch. `spec`: the job as it was read, checked by `parse_job`.
+	`output` is the absolute path it writes to.
+	'''
+	index:int
+	name:str
+	spec:Dict
+	output:str
+	frames_directory:Optional[str] = None
+
+
+@dataclass
+class JobResult:
+	'''
+	`frames` is how many frames this run rendered, so a job resumed from `--frames-dir` counts only the new ones.
+	`seconds` is wall time on the worker, rendering and encoding. `error` is None if the job succeeded.
+	'''
+	index:int
+	name:str
+	output:str
+	frames:int = 0
+	seconds:float = 0.0
+	frames_per_second:Optional[float] = None
+	reused_frames:int = 0
+	error:Optional[str] = None
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+
+@dataclass
+class BatchReport:
+	results:List[JobResult] = field(default_factory=list)
+	seconds:float = 0.0
+
+	@property
+	def failed(self) -> List[JobResult]:
+		return [result for result in self.results if not result.ok]
+
+	@property
+	def frames(self) -> int:
+		return sum(result.frames for result in self.results)
+
+	def format(self) -> str:
+		lines = [f"{'job':<24} {'frames':>7} {'seconds':>9} {'frames/s':>9}  result"]
+		for result in self.results:
+			rate = "" if result.frames_per_second is None else f"{result.frames_per_second:.1f}"
+			outcome = result.output if result.ok else f"FAILED: {result.error}"
+			lines.append(f"{result.name:<24} {result.frames:>7} {result.seconds:>9.2f} {rate:>9}  {outcome}")
+		rate = self.frames / self.seconds if self.seconds > 0 else 0.0
+		lines.append(
+			f"{len(self.results) - len(self.failed)} of {len(self.results)} jobs succeeded, "
+			f"{self.frames} frames in {self.seconds:.2f} s ({rate:.1f} frames/s)"
+		)
+		return "\n".join(lines)
+
+
+def read_specs(path:str) -> List[Dict]:
+	'''
+	Jobs from a JSON file (one job or a list) or a JSON lines file (one job per line, blank lines skipped).
+	'''
+	with open(path) as file:
+		text = file.read()
+	try:
+		specs = json.loads(text)
+	except json.JSONDecodeError:
+		specs = [json.loads(line) for line in text.splitlines() if line.strip()]
+	return specs if isinstance(specs, list) else [specs]
+
+
+def parse_job(spec:Dict, index:int, output_directory:str) -> Job:
+	'''
+	Checks `spec` has everything a job needs, without rendering anything. Raises JobError if not.
+	'''
+	if not isinstance(spec, dict):
+		raise JobError(f"job {index} isn't a JSON object")
+	name = str(spec.get("name", f"job-{index:04d}"))
+	if name in ("", ".") or ".." in name or "/" in name or "\\" in name:
+		raise JobError(f"job {index} has name {name!r}, which can't contain path separators or ..")
+	if not spec.get("blocks"):
+		raise JobError(f"{name} has no blocks")
+	if ("slide" in spec) == ("timeline" in spec):
+		raise JobError(f"{name} needs exactly one of slide or timeline")
+	quality = spec.get("quality", "ACCURATE")
+	if quality not in RenderQuality.__members__:
+		raise JobError(f"{name} has unknown quality {quality!r}, expected one of {', '.join(RenderQuality.__members__)}")
+	output = inside(output_directory, spec.get("output", f"{name}.mp4"))
+	if output is None:
+		raise JobError(f"{name} writes to {spec['output']!r}, outside the output directory {output_directory}")
+	return Job(index, name, spec, output)
+
+
+def inside(directory:str, path:str) -> Optional[str]:
+	'''
+	returns `path` resolved against `directory` as an absolute path, or None if it isn't somewhere inside `directory`.
+	'''
+	directory = os.path.abspath(directory)
+	resolved = os.path.abspath(os.path.join(directory, path))
+	if resolved == directory or os.path.commonpath([directory, resolved]) != directory:
+		return None
+	return resolved
+
+
+def make_animator(spec:Dict) -> Animator:
+	blocks = [
+		Block(block["x"], block["y"], block["height"], color=tuple(block["color"]) if "color" in block else None)
+		for block in spec["blocks"]
+	]
+	camera_spec = spec.get("camera", {})
+	theta = camera_spec.get("theta")
+	camera = Camera(
+		x=camera_spec.get("x"),
+		y=camera_spec.get("y"),
+		theta=theta,
+		forced_screen_height=camera_spec.get("forced_screen_height", 1 if theta is None else None)
+	)
+	return Animator(blocks, camera=camera)
+
+
+def make_timeline(spec:Dict) -> Timeline:
+	timeline = Timeline(spec["frame_count"])
+	for keyframe in spec.get("keyframes", []):
+		timeline.add_keyframe(keyframe["block_id"], keyframe["frame"], keyframe["x"], keyframe["y"], Easing(keyframe.get("easing", "linear")))
+	for keyframe in spec.get("camera_keyframes", []):
+		timeline.add_camera_keyframe(keyframe["frame"], keyframe["x"], keyframe["y"], Easing(keyframe.get("easing", "linear")))
+	return timeline
+
+
+def partial_path(output:str) -> str:
+	# keeps the extension, which is how the encoder picks the format
+	stem, extension = os.path.splitext(output)
+	return f"{stem}.{os.getpid()}.partial{extension}"
+
+
+def run_job(job:Job) -> JobResult:
+	'''
+	Renders and encodes one job. Any error is caught and reported in the result rather than raised,
+	so one bad job doesn't take down the rest of the batch.
+	'''
+	result = JobResult(job.index, job.name, job.output)
+	start = time.perf_counter()
+	temporary = partial_path(job.output)
+	try:
+		spec = job.spec
+		animator = make_animator(spec)
+		quality = RenderQuality[spec.get("quality", "ACCURATE")]
+		fps = int(spec.get("fps", 30))
+		if "slide" in spec:
+			slide = spec["slide"]
+			start_position:Tuple[float,float] = tuple(slide["start"]) # type:ignore
+			end_position:Tuple[float,float] = tuple(slide["end"]) # type:ignore
+			if job.frames_directory is None:
+				animator.slide(slide["block_id"], start_position, end_position, slide["frame_count"], write_path=temporary, quality=quality, fps=fps)
+				result.frames = slide["frame_count"]
+			else:
+				result.frames = animator.record_slide(
+					slide["block_id"], start_position, end_position, slide["frame_count"], job.frames_directory, quality=quality
+				)
+				animator.encode_frames(job.frames_directory, fps=fps, write_path=temporary)
+		else:
+			timeline = make_timeline(spec["timeline"])
+			animator.animate(timeline, write_path=temporary, quality=quality, fps=fps)
+			result.frames = timeline.frame_count
+		os.replace(temporary, job.output)
+		result.reused_frames = animator.frame_stats.reused
+	except Exception as error:
+		result.error = f"{type(error).__name__}: {error}"
+		result.frames = 0
+		if os.path.exists(temporary):
+			os.remove(temporary)
+	result.seconds = time.perf_counter() - start
+	if result.ok and result.seconds > 0:
+		result.frames_per_second = result.frames / result.seconds
+	return result
+
+
+def plan_jobs(specs:Sequence[Dict], output_directory:str, frames_directory:Optional[str]=None) -> Tuple[List[Job], List[JobResult]]:
+	'''
+	returns the jobs to run, and a failed result for every spec that can't be run: malformed,
+	or sharing a name or output file with a job before it.
+	'''
+	jobs:List[Job] = []
+	rejected:List[JobResult] = []
+	names:Set[str] = set()
+	outputs:Dict[str, str] = {}
+	for index, spec in enumerate(specs):
+		try:
+			job = parse_job(spec, index, output_directory)
+		except JobError as error:
+			name = spec.get("name", f"job-{index:04d}") if isinstance(spec, dict) else f"job-{index:04d}"
+			rejected.append(JobResult(index, str(name), "", error=str(error)))
+			continue
+		if job.name in names:
+			rejected.append(JobResult(index, job.name, job.output, error="another job has the same name"))
+			continue
+		if job.output in outputs:
+			rejected.append(JobResult(index, job.name, job.output, error=f"writes to the same file as {outputs[job.output]}"))
+			continue
+		names.add(job.name)
+		outputs[job.output] = job.name
+		if frames_directory is not None:
+			job.frames_directory = inside(frames_directory, job.name)
+		jobs.append(job)
+	return jobs, rejected
+
+
+def run_on_pool(jobs:Sequence[Job], workers:Optional[int]) -> Tuple[List[JobResult], List[Job]]:
+	'''
+	returns the results of the jobs that finished, and the jobs that didn't because the pool broke.
+	'''
+	results:List[JobResult] = []
+	unfinished:List[Job] = []
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		futures:Dict[Future, Job] = {executor.submit(run_job, job): job for job in jobs}
+		for future in as_completed(futures):
+			job = futures[future]
+			try:
+				results.append(future.result())
+			except BrokenProcessPool:
+				unfinished.append(job)
+	return results, unfinished
+
+
+def run_jobs(
+		specs:Sequence[Dict],
+		output_directory:str="outputs",
+		workers:Optional[int]=None,
+		frames_directory:Optional[str]=None
+	) -> BatchReport:
+	'''
+	Runs every job in `specs` on `workers` processes (one per CPU if not given), each on its own.
+	`workers=1` runs them one after another on this process instead.
+
+	A worker process dying (e.g. killed for running out of memory) takes every job still queued on the pool
+	with it. Those jobs are run again, each on a pool of its own, so only a job that kills its worker again fails.
+
+	`frames_directory`: record each slide's frames in a subdirectory of this named after the job first
+	(see `Animator.record_slide`), so running an interrupted batch again picks up where each job stopped.
+
+	returns results in the order the jobs were given.
+	'''
+	start = time.perf_counter()
+	jobs, rejected = plan_jobs(specs, output_directory, frames_directory)
+	for directory in {os.path.dirname(job.output) for job in jobs}:
+		os.makedirs(directory, exist_ok=True)
+
+	results:List[JobResult] = list(rejected)
+	if workers == 1:
+		results += [run_job(job) for job in jobs]
+	else:
+		finished, unfinished = run_on_pool(jobs, workers)
+		results += finished
+		with ThreadPoolExecutor(max_workers=workers) as threads:
+			for finished, lost in threads.map(lambda job: run_on_pool([job], 1), unfinished):
+				results += finished
+				results += [JobResult(job.index, job.name, job.output, error="its worker process died") for job in lost]
+
+	results.sort(key=lambda result: result.index)
+	return BatchReport(results, time.perf_counter() - start)
+
+
+def main(argv:Optional[Sequence[str]]=None) -> int:
+	parser = argparse.ArgumentParser(description="Render a batch of animations described in JSON or JSON lines.")
+	parser.add_argument("specs", nargs="+", help="JSON or JSON lines files of jobs")
+	parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU if not given")
+	parser.add_argument("--output-dir", default="outputs", help="relative outputs are written under this")
+	parser.add_argument("--frames-dir", default=None, help="record slide frames here so an interrupted batch can resume")
+	parser.add_argument("--report", help="write a JSON line per job here")
+	args = parser.parse_args(argv)
+
+	specs = [spec for path in args.specs for spec in read_specs(path)]
+	report = run_jobs(specs, args.output_dir, args.workers, args.frames_dir)
+
+	if args.report is not None:
+		with open(args.report, "w") as output:
+			output.write("".join(json.dumps(asdict(result)) + "\n" for result in report.results))
+	print(report.format(), file=sys.stderr)
+	return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
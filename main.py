@@ -1,4 +1,4 @@
-from backend import Renderer, Block, Camera, tan
+from backend import Renderer, Block, Camera
 
 def test_render():
 	blocks = [
@@ -25,4 +25,5 @@ def try_new():
 	]
 	renderer = Renderer(blocks=blocks, camera=Camera(forced_screen_height=1))
 	renderer.render()
-try_new()
\ No newline at end of file
+if __name__ == "__main__":
+	try_new()
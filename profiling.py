@@ -0,0 +1,253 @@
+'''
+Opt-in timing of the render and animation stages. Nothing is recorded unless a `Profiler` is active:
+
+	with Profiler(memory=True) as profiler:
+		animator.slide(block_id=2, start=(1.726,-0.22), end=(5.4, 0.22), frame_count=60)
+	print(profiler.report().format())
+
+While no profiler is active, `stage` and `frame` hand back one shared do-nothing context,
+so the instrumented code costs a global lookup per stage and nothing else.
+'''
+
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import numpy as np
+
+# the profiler currently recording, if any
+active:Optional["Profiler"] = None
+
+NOT_PROFILING:ContextManager = nullcontext()
+
+
+@dataclass(frozen=True)
+class Sample:
+	'''
+	One run of a stage. `frame` is the frame it ran for, if it ran inside `frame`.
+	`allocated` is the peak traced allocation while it ran, in bytes (0 unless the profiler traces memory).
+	'''
+	stage:str
+	frame:Optional[int]
+	start:float
+	seconds:float
+	allocated:int
+	thread:int
+
+
+@dataclass
+class StageReport:
+	calls:int
+	total_seconds:float
+	p50_seconds:float
+	p99_seconds:float
+	peak_allocated:int
+
+
+@dataclass
+class ProfileReport:
+	'''
+	`frame_p50_seconds` and `frame_p99_seconds` are over the time each frame took to render (the "frame" stage).
+	`per_frame` maps frame index to seconds spent in each stage on that frame.
+	'''
+	stages:Dict[str, StageReport]
+	frames:int
+	frame_p50_seconds:float
+	frame_p99_seconds:float
+	per_frame:Dict[int, Dict[str, float]] = field(default_factory=dict)
+
+	def to_dict(self) -> Dict:
+		return asdict(self)
+
+	def format(self) -> str:
+		lines = [f"{'stage':<12} {'calls':>7} {'total ms':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MiB':>9}"]
+		for name, stage in sorted(self.stages.items(), key=lambda item: -item[1].total_seconds):
+			lines.append(
+				f"{name:<12} {stage.calls:>7} {stage.total_seconds*1000:>10.2f} {stage.p50_seconds*1000:>9.3f} "
+				f"{stage.p99_seconds*1000:>9.3f} {stage.peak_allocated/2**20:>9.2f}"
+			)
+		lines.append(f"{self.frames} frames, p50 {self.frame_p50_seconds*1000:.3f} ms, p99 {self.frame_p99_seconds*1000:.3f} ms")
+		return "\n".join(lines)
+
+
+class Profiler:
+	'''
+	Records a `Sample` for every stage that runs while it's active (on any thread).
+
+	`memory`: also trace allocations with `tracemalloc`. This slows everything down noticeably.
+	tracemalloc only tracks one peak for the whole process, so a stage that overlaps stages on other threads
+	(rendering ahead on `prefetch`'s thread while encoding, say) is charged their allocations too.
+	`cprofile`: also run `cProfile` on the thread that activated the profiler, see `dump_cprofile`.
+
+	Frames rendered on worker processes (`workers=` in `Animator.slide`) aren't seen, only the main process is.
+	'''
+	def __init__(self, memory:bool=False, cprofile:bool=False) -> None:
+		self.memory = memory
+		self.samples:List[Sample] = []
+		self.callbacks:List[Callable[[Sample], None]] = []
+		self.cprofile:Optional[cProfile.Profile] = cProfile.Profile() if cprofile else None
+		self.local = threading.local()
+		# [allocation when the stage began, highest allocation seen since] for each stage open on any thread
+		self.open_stages:Dict["StageTimer", List[int]] = {}
+		self.memory_lock = threading.Lock()
+		self.previous:Optional[Profiler] = None
+		self.started_tracemalloc = False
+
+	def add_callback(self, callback:Callable[[Sample], None]) -> None:
+		'''
+		`callback` is called with every sample as it's recorded, on the thread that recorded it.
+		'''
+		self.callbacks.append(callback)
+
+	def __enter__(self) -> "Profiler":
+		global active
+		if self.memory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+			self.started_tracemalloc = True
+		if self.cprofile is not None:
+			self.cprofile.enable()
+		self.previous = active
+		active = self
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		global active
+		active = self.previous
+		if self.cprofile is not None:
+			self.cprofile.disable()
+		if self.started_tracemalloc:
+			tracemalloc.stop()
+			self.started_tracemalloc = False
+
+	@property
+	def current_frame(self) -> Optional[int]:
+		# the frame being rendered on this thread
+		return getattr(self.local, "frame", None)
+
+	def share_peak(self) -> int:
+		'''
+		Hands the peak since it was last reset to every open stage, before it's reset or a stage closes.
+		Call with `memory_lock` held. returns the current allocation.
+		'''
+		current, peak = tracemalloc.get_traced_memory()
+		for seen in self.open_stages.values():
+			seen[1] = max(seen[1], peak)
+		return current
+
+	def stage(self, name:str, frame:Optional[int]=None) -> "StageTimer":
+		return StageTimer(self, name, frame)
+
+	def frame(self, index:int) -> "StageTimer":
+		return StageTimer(self, "frame", index, sets_frame=True)
+
+	def record(self, sample:Sample) -> None:
+		self.samples.append(sample)
+		for callback in self.callbacks:
+			callback(sample)
+
+	def report(self) -> ProfileReport:
+		by_stage:Dict[str, List[Sample]] = {}
+		per_frame:Dict[int, Dict[str, float]] = {}
+		for sample in self.samples:
+			by_stage.setdefault(sample.stage, []).append(sample)
+			if sample.frame is not None:
+				frame = per_frame.setdefault(sample.frame, {})
+				frame[sample.stage] = frame.get(sample.stage, 0.0) + sample.seconds
+
+		stages:Dict[str, StageReport] = {}
+		for name, samples in by_stage.items():
+			seconds = np.array([sample.seconds for sample in samples])
+			p50, p99 = np.percentile(seconds, [50, 99])
+			stages[name] = StageReport(len(samples), float(seconds.sum()), float(p50), float(p99), max(sample.allocated for sample in samples))
+
+		frames = stages.get("frame")
+		return ProfileReport(
+			stages=stages,
+			frames=0 if frames is None else frames.calls,
+			frame_p50_seconds=0.0 if frames is None else frames.p50_seconds,
+			frame_p99_seconds=0.0 if frames is None else frames.p99_seconds,
+			per_frame=dict(sorted(per_frame.items()))
+		)
+
+	def dump_cprofile(self, path:str) -> None:
+		'''
+		Writes the `cProfile` stats, for `pstats` or snakeviz and the like.
+		'''
+		if self.cprofile is None:
+			raise ValueError("the profiler wasn't created with cprofile=True")
+		self.cprofile.dump_stats(path)
+
+	def dump_trace(self, path:str) -> None:
+		'''
+		Writes every sample as a Chrome trace (open it in chrome://tracing or Perfetto).
+		'''
+		events = [
+			{
+				"name": sample.stage,
+				"ph": "X",
+				"ts": sample.start * 1e6,
+				"dur": sample.seconds * 1e6,
+				"pid": 0,
+				"tid": sample.thread,
+				"args": {"frame": sample.frame, "allocated": sample.allocated},
+			}
+			for sample in self.samples
+		]
+		with open(path, "w") as trace:
+			json.dump({"traceEvents": events}, trace)
+
+
+class StageTimer:
+	def __init__(self, profiler:Profiler, name:str, frame:Optional[int], sets_frame:bool=False) -> None:
+		self.profiler = profiler
+		self.name = name
+		self.frame = frame
+		self.sets_frame = sets_frame
+
+	def __enter__(self) -> None:
+		profiler = self.profiler
+		if self.sets_frame:
+			self.outer_frame = profiler.current_frame
+			profiler.local.frame = self.frame
+		elif self.frame is None:
+			self.frame = profiler.current_frame
+		if profiler.memory and tracemalloc.is_tracing():
+			with profiler.memory_lock:
+				current = profiler.share_peak()
+				tracemalloc.reset_peak()
+				profiler.open_stages[self] = [current, current]
+		self.start = time.perf_counter()
+
+	def __exit__(self, *exc_info) -> None:
+		seconds = time.perf_counter() - self.start
+		allocated = 0
+		profiler = self.profiler
+		if profiler.memory and tracemalloc.is_tracing():
+			with profiler.memory_lock:
+				# tracing may have started after this stage did
+				if self in profiler.open_stages:
+					profiler.share_peak()
+					began, highest = profiler.open_stages.pop(self)
+					allocated = highest - began
+		if self.sets_frame:
+			profiler.local.frame = self.outer_frame
+		profiler.record(Sample(self.name, self.frame, self.start, seconds, allocated, threading.get_ident()))
+
+
+def stage(name:str, frame:Optional[int]=None) -> ContextManager:
+	'''
+	Times the enclosed block as `name` for the active profiler. `frame` defaults to the frame being rendered on this thread.
+	'''
+	return NOT_PROFILING if active is None else active.stage(name, frame)
+
+
+def frame(index:int) -> ContextManager:
+	'''
+	Times rendering frame `index`, and files the stages run inside it under that frame.
+	'''
+	return NOT_PROFILING if active is None else active.frame(index)
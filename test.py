@@ -242,6 +242,23 @@ class projectionTests(testGroup):
 			y_position = -0.4
 			location = renderer.find_projected_partition(y_position, ranges)
 
+	def test_partitions_match_quantize_on_boundaries(self):
+		renderer = Renderer()
+		ranges = renderer.quantize(resolution=7)
+		partitions = get_partitions(7)
+		values = [range_.start for range_ in ranges] + [range_.stop for range_ in ranges] + [0.5, 0.999]
+		asserts.assertEquals(
+			[partitions.find(value) for value in values],
+			[renderer.find_projected_partition(value, ranges) for value in values]
+		)
+
+	def test_partitions_out_of_range(self):
+		with asserts.assertRaises(OutOfRangeError):
+			get_partitions(5).find(1.02)
+
+	def test_partitions_are_reused(self):
+		asserts.assertEquals(get_partitions(1000) is get_partitions(1000), True)
+
 	def test_project_onto_range_contained(self):
 		block = Block(0,0.2,0.2)
 		renderer = Renderer()
@@ -338,4 +355,1205 @@ class colorTests(testGroup):
 			]
 		)
 
-test_all(mainTests, continuousRangeTests, projectionTests, colorTests)
\ No newline at end of file
+	def test_composite_spans(self):
+		# testGetColorMap's scene flipped upside down, given as spans instead of vectors
+		renderer = Renderer(camera=Camera(forced_screen_height=1))
+		column = renderer.composite(
+			np.array([2, 1, 2, 3]),
+			np.array([3, 2, 3, 3]),
+			np.array([1.0, 2.0, 3.0, 4.0]),
+			np.array([(255,255,0), (255,0,0), (255,125,0), (0,125,255)], dtype=np.uint8),
+			4
+		)
+		asserts.assertEquals(
+			[column.dtype == np.uint8, column.shape, [tuple(pixel) for pixel in column.tolist()]],
+			[True, (4,3), [(255,255,0), (255,255,0), (255,0,0), (255,255,255)]]
+		)
+
+	def test_composite_tie_goes_to_later_block(self):
+		renderer = Renderer()
+		column = renderer.composite(
+			np.array([0, 0]),
+			np.array([1, 0]),
+			np.array([2.0, 2.0]),
+			np.array([(255,0,0), (0,0,255)], dtype=np.uint8),
+			2
+		)
+		asserts.assertEquals(
+			[tuple(pixel) for pixel in column.tolist()],
+			[(255,0,0), (0,0,255)]
+		)
+
+	def test_composite_spans_matches_depth_buffer(self):
+		renderer = Renderer()
+		rng = np.random.default_rng(3)
+		bottoms = rng.integers(0, 40, 25)
+		tops = np.minimum(bottoms + rng.integers(0, 20, 25), 39)
+		depths = rng.integers(1, 4, 25).astype(float) # plenty of ties
+		colors = rng.integers(0, 256, size=(25, 3), dtype=np.uint8)
+		asserts.assertEquals(
+			renderer.composite_spans(bottoms, tops, depths, colors, 40).tolist(),
+			renderer.composite(bottoms, tops, depths, colors, 40).tolist()
+		)
+
+	def test_front_to_back_matches_depth_buffer(self):
+		renderer = Renderer()
+		rng = np.random.default_rng(4)
+		bottoms = rng.integers(0, 40, 25)
+		tops = np.minimum(bottoms + rng.integers(0, 20, 25), 39)
+		depths = rng.integers(1, 4, 25).astype(float)
+		colors = rng.integers(0, 256, size=(25, 3), dtype=np.uint8)
+		asserts.assertEquals(
+			renderer.composite_front_to_back(bottoms, tops, depths, colors, 40).tolist(),
+			renderer.composite(bottoms, tops, depths, colors, 40).tolist()
+		)
+
+	def test_vectorized_matches_depth_buffer(self):
+		renderer = Renderer()
+		rng = np.random.default_rng(5)
+		bottoms = rng.integers(0, 40, 25)
+		tops = np.minimum(bottoms + rng.integers(0, 20, 25), 39)
+		depths = rng.integers(1, 4, 25).astype(float)
+		colors = rng.integers(0, 256, size=(25, 3), dtype=np.uint8)
+		asserts.assertEquals(
+			renderer.composite_vectorized(bottoms, tops, depths, colors, 40).tolist(),
+			renderer.composite(bottoms, tops, depths, colors, 40).tolist()
+		)
+
+	def test_front_to_back_skips_hidden_blocks(self):
+		renderer = Renderer(blocks=[
+			Block(x=5, y=0, height=100, color=(255,205,50)), # covers everything
+			Block(x=6, y=0.1, height=0.5, color=(255,0,0)),
+			Block(x=7, y=-0.1, height=0.5, color=(0,255,0)),
+			Block(x=1.73, y=0.25, height=0.25, color=(100,125,255)),
+		], camera=Camera(forced_screen_height=1))
+		column = renderer.rasterize(resolution=1000, compositor=Compositor.FRONT_TO_BACK)
+		occluded = renderer.stats.occluded
+		asserts.assertEquals(
+			[column.tolist() == renderer.rasterize(resolution=1000).tolist(), occluded],
+			[True, 2]
+		)
+
+	def test_color_vector_from_spans(self):
+		blocks = [Block(1, 0.75, 0.25, color=(255,255,0)), Block(2, 0.6, 0.24, color=(255, 0, 0))]
+		renderer = Renderer(camera=Camera(forced_screen_height=1))
+		blocks[0].vector = SpanVector(0, 1, blocks[0].color, 4)
+		blocks[1].vector = SpanVector(1, 2, blocks[1].color, 4)
+		asserts.assertEquals(
+			renderer.generate_color_vector(blocks, 4),
+			[(255,255,255), (255,0,0), (255,255,0), (255,255,0)]
+		)
+
+class spanVectorTests(testGroup):
+	def test_matches_dense_vector(self):
+		renderer = Renderer()
+		span = renderer.create_span_from_partitions([2,3,4], 5, BLACK)
+		asserts.assertEquals(
+			[span == renderer.create_vector_from_partitions([2,3,4], 5, BLACK), span[1], span[-1], len(span)],
+			[True, BG, BLACK, 5]
+		)
+
+	def test_empty(self):
+		renderer = Renderer()
+		span = renderer.create_span_from_partitions([], 5, BLACK)
+		asserts.assertEquals([span.is_empty, span.dense()], [True, [BG]*5])
+
+	def test_position_vectors_are_spans(self):
+		renderer = Renderer(blocks=[Block(2,0.4,0.96)], camera=Camera(forced_screen_height=1))
+		renderer.generate_all_position_vectors(resolution=100_000)
+		vector = renderer.blocks[0].vector
+		asserts.assertEquals(
+			[isinstance(vector, SpanVector), vector.stop, len(vector)],
+			[True, 99_999, 100_000]
+		)
+
+class rasterizeTests(testGroup):
+	def test_project_spans(self):
+		renderer = Renderer(camera=Camera(forced_screen_height=1))
+		bottoms, tops, visible = renderer.project_spans([Block(2,0.4,0.96), Block(2,200,0.96)], 5)
+		asserts.assertEquals(
+			[int(bottoms[0]), int(tops[0]), bool(visible[0]), bool(visible[1])],
+			[2, 4, True, False]
+		)
+
+	def test_rasterize_matches_position_vectors(self):
+		blocks = [
+			Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
+			Block(x=2.956,y=-0.22,height=0.072, color=(0,255,255)),
+			Block(x=5, y=0, height=100, color=(255,205,50)),
+			Block(x=1, y=45, height=0.4, color=(0,255,0)),
+			Block(x = 1.73, y=0.25, height=0.25, color=(100,125,255))
+		]
+		renderer = Renderer(blocks=blocks, camera=Camera(forced_screen_height=1))
+		renderer.generate_all_position_vectors(resolution=200)
+		expected = renderer.generate_color_vector(renderer.blocks, 200)
+		column = renderer.rasterize(resolution=200)
+		asserts.assertEquals(
+			[tuple(pixel) for pixel in column.tolist()],
+			list(expected)
+		)
+
+	def test_generate_frame_matches_pil_resize(self):
+		from PIL import Image
+		renderer = Renderer()
+		column = np.random.default_rng(0).integers(0, 256, size=(1000, 3), dtype=np.uint8)
+		for image_size in [(100, 500), (300, 1500), (7, 333)]:
+			resized = Image.fromarray(column.reshape(-1, 1, 3)).resize(image_size, resample=Image.Resampling.NEAREST)
+			frame = renderer.generate_frame(column, image_size)
+			asserts.assertEquals(
+				[frame.shape, frame.tobytes() == np.asarray(resized).tobytes()],
+				[(image_size[1], image_size[0], 3), True]
+			)
+
+	def test_area_resample_averages_slices(self):
+		renderer = Renderer()
+		column = np.array([[0,0,0], [255,255,255], [0,0,0]], dtype=np.uint8)
+		asserts.assertEquals(
+			renderer.resample_column(column, 2, Resample.AREA).tolist(),
+			[[85,85,85], [85,85,85]]
+		)
+
+	def test_area_resample_exact_multiple(self):
+		renderer = Renderer()
+		column = np.random.default_rng(1).integers(0, 256, size=(6000, 3), dtype=np.uint8)
+		asserts.assertEquals(
+			renderer.resample_column(column, 1500, Resample.AREA).tolist(),
+			np.rint(column.reshape(1500, 4, 3).mean(axis=1)).astype(np.uint8).tolist()
+		)
+
+	def test_resample_maps_are_reused(self):
+		asserts.assertEquals(
+			[get_nearest_rows(100_000, 1500) is get_nearest_rows(100_000, 1500), get_area_kernel(6000, 1500) is get_area_kernel(6000, 1500)],
+			[True, True]
+		)
+
+	def test_rasterize_empty(self):
+		renderer = Renderer()
+		column = renderer.rasterize(resolution=5)
+		asserts.assertEquals(
+			[tuple(pixel) for pixel in column.tolist()],
+			[BG]*5
+		)
+
+class cullingTests(testGroup):
+	def make_renderer(self):
+		return Renderer(blocks=[
+			Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
+			Block(x=5, y=0, height=100, color=(255,205,50)),
+			Block(x=1, y=45, height=0.4, color=(0,255,0)), # above the view
+			Block(x=0, y=0, height=1, color=(0,0,255)), # at the camera
+			Block(x=-1, y=0, height=1, color=(0,0,255)), # behind the camera
+		], camera=Camera(forced_screen_height=1))
+
+	def test_stats_count_culled_blocks(self):
+		renderer = self.make_renderer()
+		renderer.rasterize(resolution=1000)
+		asserts.assertEquals(
+			renderer.stats,
+			RenderStats(blocks=5, culled=3, projected=2, visible=2)
+		)
+
+	def test_block_at_camera_projects_to_nothing(self):
+		renderer = self.make_renderer()
+		vector = renderer.generate_position_vector(Block(0, 0, 1), 10)
+		asserts.assertEquals(vector, [BG]*10)
+
+	def test_view_index_matches_culling(self):
+		renderer = self.make_renderer()
+		culled = renderer.rasterize(resolution=1000)
+		indexed = renderer.rasterize(resolution=1000, index=ViewIndex(renderer.blocks))
+		asserts.assertEquals(
+			[indexed.tolist() == culled.tolist(), renderer.stats.culled],
+			[True, 3]
+		)
+
+class precisionTests(testGroup):
+	# the scenes used around the repo (this file and main.py), rendered once with floats and once with mpmath
+	scenes = [
+		[Block(x=2,y=0.4,height=0.96)],
+		[Block(x=1.72,y=0.37,height=0.072), Block(x=1.956,y=-0.22,height=0.072)],
+		[
+			Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
+			Block(x=2.956,y=-0.22,height=0.072, color=(0,255,255)),
+			Block(x=5, y=0, height=100, color=(255,205,50)),
+			Block(x=1, y=45, height=0.4, color=(0,255,0)),
+			Block(x = 1.73, y=0.25, height=0.25, color=(100,125,255)),
+			# background coloured, so transparent: the red block behind it still shows
+			Block(x=1.5, y=0.28, height=0.1, color=BG)
+		],
+		[Block(1, 0.35, 0.25), Block(0.17, -0.012, 0.25), Block(1, 0.2, 0.25), Block(2, 200, 0.96)],
+	]
+
+	def assert_fast_matches_reference(self, camera_args:dict, resolution:int):
+		for scene in self.scenes:
+			fast = Renderer(blocks=scene, camera=Camera(**camera_args))
+			reference = Renderer(blocks=scene, camera=Camera(**camera_args, precision=Precision.REFERENCE))
+			asserts.assertEquals(
+				fast.rasterize(resolution=resolution).tolist(),
+				reference.rasterize(resolution=resolution).tolist()
+			)
+
+	def test_default_precision_is_fast(self):
+		camera = Camera()
+		asserts.assertEquals([camera.precision, type(camera.m)], [Precision.FAST, float])
+
+	def test_fast_matches_reference_forced_height(self):
+		self.assert_fast_matches_reference({"forced_screen_height": 1}, 1000)
+
+	def test_fast_matches_reference_accurate(self):
+		self.assert_fast_matches_reference({"forced_screen_height": 1}, 100_000)
+
+	def test_fast_matches_reference_theta(self):
+		self.assert_fast_matches_reference({"theta": 0.5}, 1000)
+		self.assert_fast_matches_reference({}, 1000)
+
+class columnBufferTests(testGroup):
+	def make_scene(self):
+		return [
+			Block(x=1.72,y=0.3,height=0.072, color=(255,0,0)),
+			Block(x=1.726,y=-0.22,height=0.072, color=(0,255,255)),
+			Block(x=5, y=0, height=100, color=(255,205,50)),
+			Block(x=1, y=45, height=0.4, color=(0,255,0)),
+			Block(x = 1.73, y=0.25, height=0.25, color=(100,125,255))
+		]
+
+	def test_moving_block_matches_full_render(self):
+		renderer = Renderer(blocks=self.make_scene(), camera=Camera(forced_screen_height=1))
+		blocks = renderer.blocks
+		column_buffer = ColumnBuffer(renderer, blocks, 1000)
+		for x, y in [(1.9, 0.0), (5.4, 0.22), (1.7, 0.3), (3, -0.4)]:
+			blocks[1].x, blocks[1].y = x, y
+			column_buffer.update([1])
+			asserts.assertEquals(
+				column_buffer.column.tolist(),
+				renderer.rasterize(resolution=1000).tolist()
+			)
+
+	def test_background_block_is_transparent(self):
+		renderer = Renderer(blocks=self.make_scene(), camera=Camera(forced_screen_height=1))
+		blocks = renderer.blocks
+		blocks[4].color = BG
+		column_buffer = ColumnBuffer(renderer, blocks, 1000)
+		blocks[0].color = BG
+		column_buffer.update([0])
+		reference = Renderer(blocks=blocks, camera=Camera(forced_screen_height=1, precision=Precision.REFERENCE))
+		asserts.assertEquals(column_buffer.column.tolist(), reference.rasterize(resolution=1000).tolist())
+
+	def test_unmoved_block_is_not_reprojected(self):
+		renderer = Renderer(blocks=self.make_scene(), camera=Camera(forced_screen_height=1))
+		blocks = renderer.blocks
+		column_buffer = ColumnBuffer(renderer, blocks, 1000)
+		asserts.assertEquals(column_buffer.update(), False)
+		blocks[0].y = 0.1
+		asserts.assertEquals(column_buffer.update(), True)
+
+	def test_hidden_move_leaves_column_unchanged(self):
+		renderer = Renderer(blocks=self.make_scene(), camera=Camera(forced_screen_height=1))
+		blocks = renderer.blocks
+		blocks[1].x = 5.2
+		column_buffer = ColumnBuffer(renderer, blocks, 1000)
+		blocks[1].y = 0.1
+		asserts.assertEquals(column_buffer.update([1]), False)
+
+class sceneTests(testGroup):
+	def test_views_read_and_write_columns(self):
+		scene = Scene.from_blocks([Block(1, 0.2, 0.5, color=(1,2,3)), Block(2, -0.1, 0.3)])
+		block = scene[0]
+		block.x = 4
+		asserts.assertEquals(
+			[scene.x.tolist(), block.top, block.color, scene[1].color],
+			[[4.0, 2.0], 0.45, (1,2,3), (0,0,0)]
+		)
+
+	def test_lookup_by_id(self):
+		renderer = Renderer(blocks=[Block(1, 0, 1), Block(2, 0, 1), Block(3, 0, 1)])
+		block = renderer.retrieve_block_from_id(2)
+		asserts.assertEquals([block.row, block.x], [1, 2.0])
+		with asserts.assertRaises(NotFounderror):
+			renderer.retrieve_block_from_id(4)
+
+	def test_renderer_copies_blocks(self):
+		blocks = [Block(1.5, 0, 0.5, color=(255, 0, 0), id=7), Block(2, 0.2, 0.3)]
+		renderer = Renderer(blocks=blocks, camera=Camera(forced_screen_height=1))
+		before = renderer.rasterize(resolution=200).tolist()
+		blocks[0].y = 5
+		after_caller_edit = renderer.rasterize(resolution=200).tolist()
+		renderer.retrieve_block_from_id(1).y = 5
+		after_scene_edit = renderer.rasterize(resolution=200).tolist()
+		asserts.assertEquals(
+			[[block.id for block in blocks], renderer.blocks.id.tolist(), after_caller_edit == before, after_scene_edit == before],
+			[[7, None], [1, 2], True, False]
+		)
+
+	def test_add_grows_columns(self):
+		scene = Scene(capacity=1)
+		for i in range(10):
+			scene.add(i+1, 0, 1)
+		asserts.assertEquals(
+			[len(scene), scene.id.tolist(), scene.view(10).x],
+			[10, list(range(1, 11)), 10.0]
+		)
+
+	def test_duplicate_id(self):
+		with asserts.assertRaises(ValueError):
+			Scene.from_arrays([1, 2], [0, 0], [1, 1], [(0,0,0), (0,0,0)], id=[1, 1])
+
+	def test_ids_follow_the_largest(self):
+		scene = Scene.from_arrays([1, 2], [0, 0], [1, 1], [(0,0,0), (0,0,0)], id=[3, 7])
+		scene.add(3, 0, 1, id=12)
+		asserts.assertEquals([scene.add(4, 0, 1).id, scene.add(5, 0, 1).id], [13, 14])
+
+	def test_rasterize_blocks_with_clashing_ids(self):
+		blocks = [Block(1, 0, 1, id=1), Block(2, 0, 1, id=1)]
+		renderer = Renderer(camera=Camera(forced_screen_height=1))
+		asserts.assertEquals(
+			renderer.rasterize(blocks, 100).tolist(),
+			Renderer(blocks, Camera(forced_screen_height=1)).rasterize(resolution=100).tolist()
+		)
+
+	def test_rasterize_scene_matches_blocks(self):
+		rng = np.random.default_rng(2)
+		count = 500
+		x, y, height = rng.uniform(1, 6, count), rng.uniform(-1, 1, count), rng.uniform(0, 0.2, count)
+		color = rng.integers(0, 255, size=(count, 3))
+		scene = Scene.from_arrays(x, y, height, color)
+		blocks = [Block(x[i], y[i], height[i], color=tuple(color[i].tolist())) for i in range(count)]
+		renderer = Renderer(camera=Camera(forced_screen_height=1))
+		asserts.assertEquals(
+			renderer.rasterize(scene, 1000).tolist(),
+			renderer.rasterize(blocks, 1000).tolist()
+		)
+
+class benchmarkTests(testGroup):
+	def test_scene_is_reproducible(self):
+		from benchmark import BenchmarkScene
+		from animator import RenderQuality
+		scene = BenchmarkScene(block_count=20, overlap=2, quality=RenderQuality.FAST, frame_count=5)
+		asserts.assertEquals(
+			[(block.x, block.y, block.height, block.color) for block in scene.make_blocks()],
+			[(block.x, block.y, block.height, block.color) for block in scene.make_blocks()]
+		)
+
+	def test_results_are_machine_readable(self):
+		import json
+		from benchmark import BenchmarkScene, run_benchmarks
+		from animator import RenderQuality
+		scene = BenchmarkScene(block_count=3, overlap=1, quality=RenderQuality.FAST, frame_count=2, vector_resolution=50)
+		results = run_benchmarks([scene], stages=["generate_position_vector", "rasterize"], repeats=1)
+		decoded = [json.loads(json.dumps(result)) for result in results]
+		asserts.assertEquals(
+			[(result["stage"], result["calls"], result["scene"]["vector_resolution"]) for result in decoded],
+			[("generate_position_vector", 3, 50), ("rasterize", 1, 50)]
+		)
+
+class timelineTests(testGroup):
+	def test_keyframes_interpolate(self):
+		from timeline import Timeline, Easing
+		timeline = Timeline(5).add_keyframe(1, 0, 0, 0).add_keyframe(1, 4, 4, -2).add_keyframe(2, 2, 1, 1)
+		x, y = timeline.evaluate()
+		asserts.assertEquals(
+			[x[:, 0].tolist(), y[:, 0].tolist(), x[:, 1].tolist()],
+			[[0, 1, 2, 3, 4], [0, -0.5, -1, -1.5, -2], [1, 1, 1, 1, 1]]
+		)
+
+	def test_holds_outside_keyframes_and_easing_endpoints(self):
+		from timeline import Timeline, Easing
+		timeline = Timeline(10).move(1, (0, 0), (1, 1), start_frame=2, end_frame=6, easing=Easing.EASE_IN_OUT)
+		x, _ = timeline.evaluate()
+		asserts.assertEquals(
+			[x[:3, 0].tolist(), x[4, 0], x[6:, 0].tolist()],
+			[[0, 0, 0], 0.5, [1, 1, 1, 1]]
+		)
+
+	def test_changes_mask(self):
+		from timeline import Timeline
+		timeline = Timeline(4).move(1, (0, 0), (0, 2), start_frame=1, end_frame=2).add_keyframe(2, 0, 1, 1)
+		asserts.assertEquals(
+			timeline.changes(*timeline.evaluate()).tolist(),
+			[[True, True], [False, False], [True, False], [False, False]]
+		)
+
+	def test_frames_match_full_render(self):
+		from timeline import Timeline
+		from animator import Animator, RenderQuality
+		make_blocks = lambda: [Block(1.72, 0.3, 0.072, color=(255,0,0)), Block(1.726, -0.22, 0.072, color=(0,255,255)), Block(5, 0, 100, color=(255,205,50))]
+		timeline = Timeline(6).move(2, (1.726, -0.22), (1.726, 0.3), end_frame=3).move(1, (1.72, 0.3), (1.9, 0.3), start_frame=2, end_frame=4)
+		frames = list(Animator(make_blocks()).iter_timeline(timeline, RenderQuality.FAST))
+		reference = Animator(make_blocks())
+		x, y = timeline.evaluate()
+		matches = []
+		for frame in range(6):
+			for column, block_id in enumerate(timeline.block_ids):
+				block = reference.blocks.view(block_id)
+				block.x, block.y = x[frame, column], y[frame, column]
+			expected = reference.generate_frame(reference.rasterize(resolution=1000), RenderQuality.FAST.image_resolution)
+			matches.append(bool((frames[frame] == expected).all()))
+		asserts.assertEquals([matches, frames[5] is frames[4]], [[True]*6, True])
+
+class frameReuseTests(testGroup):
+	def test_cache_finds_earlier_columns(self):
+		from animator import FrameCache, FrameStats
+		stats = FrameStats()
+		frame_cache = FrameCache(stats)
+		first = np.zeros((4, 3), dtype=np.uint8)
+		second = np.ones((4, 3), dtype=np.uint8)
+		frames = [frame_cache.frame(column, True, column.copy) for column in (first, second, first.copy(), first)]
+		asserts.assertEquals(
+			[frames[2] is frames[0], frames[3] is frames[0], frames[1] is frames[0], stats.rendered, stats.repeated],
+			[True, True, False, 2, 2]
+		)
+
+	def test_cache_evicts_least_recently_used(self):
+		from animator import FrameCache, FrameStats
+		stats = FrameStats()
+		frame_cache = FrameCache(stats, size=2)
+		columns = [np.full((4, 3), i, dtype=np.uint8) for i in range(3)]
+		for column in columns + columns[:1]:
+			frame_cache.frame(column, True, column.copy)
+		asserts.assertEquals([stats.rendered, stats.repeated], [4, 0])
+
+	def test_occluded_frames_are_reused(self):
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		target = animator.retrieve_block_from_id(2)
+		frames = list(animator.iter_inbetweens(60, target, (1.726, -0.22), (5.4, 0.22), RenderQuality.FAST))
+		stats = animator.frame_stats
+		asserts.assertEquals(
+			[stats.frames, stats.rendered + stats.reused, stats.reused > 0, frames[-1] is frames[-2]],
+			[60, 60, True, True]
+		)
+
+class parallelTests(testGroup):
+	def slide(self, workers, first_frame:int=0):
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		target = animator.retrieve_block_from_id(2)
+		frames = list(animator.iter_inbetweens(40, target, (1.726, -0.22), (5.4, 0.22), RenderQuality.FAST, workers=workers, first_frame=first_frame))
+		return np.array(frames).tolist(), animator.frame_stats.frames, (target.x, target.y)
+
+	def test_workers_match_serial(self):
+		asserts.assertEquals(self.slide(workers=2), self.slide(workers=None))
+
+	def test_workers_match_serial_part_way(self):
+		asserts.assertEquals(self.slide(workers=3, first_frame=25), self.slide(workers=None, first_frame=25))
+
+class cameraTests(testGroup):
+	def make_arrays(self):
+		rng = np.random.default_rng(4)
+		count = 300
+		return rng.uniform(1, 6, count), rng.uniform(-1, 1, count), rng.uniform(0, 0.2, count), rng.integers(0, 255, size=(count, 3))
+
+	def test_panning_matches_moving_every_block(self):
+		x, y, height, color = self.make_arrays()
+		panned = Renderer(Scene.from_arrays(x, y, height, color), Camera(x=0.4, y=-0.3, forced_screen_height=1))
+		moved = Renderer(Scene.from_arrays(x - 0.4, y + 0.3, height, color), Camera(forced_screen_height=1))
+		asserts.assertEquals(
+			panned.rasterize(resolution=1000).tolist(),
+			moved.rasterize(resolution=1000).tolist()
+		)
+
+	def test_panning_matches_reference(self):
+		blocks = lambda: [Block(1.72, 0.3, 0.072, color=(255,0,0)), Block(1.726, -0.22, 0.072, color=(0,255,255)), Block(5, 0, 100, color=(255,205,50))]
+		fast = Renderer(blocks(), Camera(x=0.2, y=0.1, forced_screen_height=1))
+		reference = Renderer(blocks(), Camera(x=0.2, y=0.1, forced_screen_height=1, precision=Precision.REFERENCE))
+		asserts.assertEquals(
+			fast.rasterize(resolution=1000).tolist(),
+			reference.rasterize(resolution=1000).tolist()
+		)
+
+	def test_projection_follows_theta(self):
+		camera = Camera(theta=0.5)
+		renderer = Renderer(camera=camera)
+		screen = renderer.projected_screen
+		unchanged = renderer.projected_screen is screen
+		camera.x = 3
+		still_unchanged = renderer.projected_screen is screen
+		camera.theta = 1
+		asserts.assertEquals(
+			[unchanged, still_unchanged, renderer.projected_screen is screen, round(renderer.projected_screen.height, 6)],
+			[True, True, False, round(4 * math.tan(0.5), 6)]
+		)
+
+	def test_projection_follows_m(self):
+		camera = Camera(theta=0.5)
+		screen = camera.projected_screen
+		camera.m = 0.25
+		asserts.assertAlmostEquals(
+			[camera.projected_screen.height, camera.theta, float(camera.projected_screen is screen)],
+			[1.0, 2 * math.atan(0.25), 0.0],
+			9
+		)
+
+	def test_stale_index_is_ignored(self):
+		x, y, height, color = self.make_arrays()
+		renderer = Renderer(Scene.from_arrays(x, y, height, color), Camera(forced_screen_height=1))
+		index = ViewIndex(renderer.blocks, renderer.camera)
+		renderer.camera.y = 0.5
+		asserts.assertEquals(
+			renderer.rasterize(resolution=1000, index=index).tolist(),
+			renderer.rasterize(resolution=1000).tolist()
+		)
+
+	def test_column_buffer_follows_camera(self):
+		x, y, height, color = self.make_arrays()
+		renderer = Renderer(Scene.from_arrays(x, y, height, color), Camera(forced_screen_height=1))
+		column_buffer = ColumnBuffer(renderer, renderer.blocks, 1000)
+		matches = []
+		for camera_x, camera_y in [(0.3, 0.0), (0.3, 0.2), (-0.1, 0.2)]:
+			renderer.camera.x, renderer.camera.y = camera_x, camera_y
+			column_buffer.update([])
+			matches.append(column_buffer.column.tolist() == renderer.rasterize(resolution=1000).tolist())
+		asserts.assertEquals(matches, [True, True, True])
+
+	def test_camera_path(self):
+		from timeline import Timeline
+		from animator import Animator, RenderQuality
+		x, y, height, color = self.make_arrays()
+		animator = Animator(Scene.from_arrays(x, y, height, color))
+		timeline = Timeline(8).move_camera((0, 0), (0.5, 0.2), end_frame=5)
+		frames = list(animator.iter_timeline(timeline, RenderQuality.FAST))
+		camera_x, camera_y = timeline.evaluate_camera()
+		reference = Renderer(Scene.from_arrays(x, y, height, color), Camera(forced_screen_height=1))
+		matches = []
+		for frame in range(8):
+			reference.camera.x, reference.camera.y = camera_x[frame], camera_y[frame]
+			expected = reference.generate_frame(reference.rasterize(resolution=1000), RenderQuality.FAST.image_resolution)
+			matches.append(bool((frames[frame] == expected).all()))
+		asserts.assertEquals(
+			[matches, animator.frame_stats.unchanged, animator.blocks.x.tolist() == x.tolist()],
+			[[True]*8, 2, True]
+		)
+
+class profilingTests(testGroup):
+	def test_disabled_is_shared_no_op(self):
+		import profiling
+		asserts.assertEquals(
+			[profiling.active, profiling.stage("composite") is profiling.stage("upscale"), profiling.frame(3) is profiling.NOT_PROFILING],
+			[None, True, True]
+		)
+
+	def test_stages_are_filed_under_frames(self):
+		from profiling import Profiler
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		target = animator.retrieve_block_from_id(2)
+		with Profiler() as profiler:
+			frames = list(animator.iter_inbetweens(10, target, (1.726, -0.22), (1.9, 0.22), RenderQuality.FAST))
+		report = profiler.report()
+		asserts.assertEquals(
+			[len(frames), report.frames, report.stages["upscale"].calls, sorted(report.per_frame[3]), report.frame_p50_seconds <= report.frame_p99_seconds],
+			[10, 10, 10, ["composite", "frame", "project", "quantize", "upscale"], True]
+		)
+
+	def test_nested_allocations_reach_outer_stage(self):
+		import profiling
+		with profiling.Profiler(memory=True) as profiler:
+			with profiling.stage("outer"):
+				with profiling.stage("inner"):
+					block = np.ones(1_000_000)
+				del block
+		report = profiler.report()
+		asserts.assertEquals(
+			[report.stages["inner"].peak_allocated >= 8_000_000, report.stages["outer"].peak_allocated >= 8_000_000],
+			[True, True]
+		)
+
+	def test_allocations_on_another_thread(self):
+		# rendering ahead on one thread while encoding on another: the encode stage resets tracemalloc's
+		# peak while the render stage is still open, after its allocation has already been freed
+		import threading
+		import profiling
+		allocated, encoding = threading.Event(), threading.Event()
+		def render():
+			with profiling.stage("render"):
+				block = np.ones(1_000_000)
+				del block
+				allocated.set()
+				encoding.wait()
+		with profiling.Profiler(memory=True) as profiler:
+			renderer = threading.Thread(target=render)
+			renderer.start()
+			allocated.wait()
+			with profiling.stage("encode"):
+				encoding.set()
+				renderer.join()
+		report = profiler.report()
+		asserts.assertEquals(
+			[report.stages["render"].peak_allocated >= 8_000_000, len({sample.thread for sample in profiler.samples})],
+			[True, 2]
+		)
+
+	def test_trace_export(self):
+		import json, os, tempfile
+		import profiling
+		with profiling.Profiler(cprofile=True) as profiler:
+			with profiling.frame(0):
+				Renderer(blocks=columnBufferTests().make_scene(), camera=Camera(forced_screen_height=1)).rasterize(resolution=100)
+		with tempfile.TemporaryDirectory() as scratch:
+			profiler.dump_trace(os.path.join(scratch, "trace.json"))
+			profiler.dump_cprofile(os.path.join(scratch, "profile.prof"))
+			with open(os.path.join(scratch, "trace.json")) as trace:
+				events = json.load(trace)["traceEvents"]
+			exported = os.path.getsize(os.path.join(scratch, "profile.prof")) > 0
+		asserts.assertEquals(
+			[sorted({event["name"] for event in events}), {event["args"]["frame"] for event in events}, exported],
+			[["composite", "cull", "frame", "project", "quantize"], {0}, True]
+		)
+
+class importTests(testGroup):
+	# generous on purpose, it only has to catch something heavy creeping back in at import time
+	IMPORT_BUDGET_SECONDS = 1.0
+
+	def import_in_fresh_interpreter(self, module:str, then:str=""):
+		'''
+		Imports `module` in a new interpreter, so nothing this test run has loaded counts, then runs `then`.
+		returns the import time and which heavy modules were loaded right after the import and after `then`.
+		'''
+		import json, subprocess, sys, os
+		heavy = "sorted(name for name in ('PIL', 'mpmath', 'imageio') if name in sys.modules)"
+		script = (
+			"import sys, time\n"
+			"start = time.perf_counter()\n"
+			f"import {module}\n"
+			"seconds = time.perf_counter() - start\n"
+			f"loaded = {heavy}\n"
+			f"{then}\n"
+			"import json\n"
+			f"print(json.dumps({{'seconds': seconds, 'loaded': loaded, 'loaded_after': {heavy}}}))\n"
+		)
+		output = subprocess.run(
+			[sys.executable, "-c", script], capture_output=True, text=True, check=True,
+			cwd=os.path.dirname(os.path.abspath(__file__))
+		).stdout
+		return json.loads(output.splitlines()[-1])
+
+	def test_animator_import_is_light(self):
+		result = self.import_in_fresh_interpreter("animator")
+		asserts.assertEquals([result["loaded"], result["seconds"] < self.IMPORT_BUDGET_SECONDS], [[], True])
+
+	def test_heavy_modules_load_on_first_use(self):
+		result = self.import_in_fresh_interpreter("backend", then=(
+			"import numpy as np\n"
+			"backend.Renderer(camera=backend.Camera(precision=backend.Precision.REFERENCE))\n"
+			"backend.Renderer().generate_image_from_column(np.zeros((10, 3), dtype=np.uint8))\n"
+			"assert float(backend.load_mpmath().mp.dps) == backend.REFERENCE_DPS"
+		))
+		asserts.assertEquals([result["loaded"], result["loaded_after"]], [[], ["PIL", "mpmath"]])
+
+class prefetchTests(testGroup):
+	def test_order_and_bound(self):
+		from animator import prefetch
+		produced = []
+		def items():
+			for i in range(20):
+				produced.append(i)
+				yield i
+		ahead = []
+		consumed = []
+		for item in prefetch(items(), queue_size=3):
+			consumed.append(item)
+			ahead.append(len(produced) - len(consumed))
+		# at most a full queue, plus one item waiting to be put
+		asserts.assertEquals([consumed, max(ahead) <= 4], [list(range(20)), True])
+
+	def test_producer_error_reaches_encoder(self):
+		import os, tempfile, threading
+		from animator import Animator
+		def frames():
+			for _ in range(3):
+				yield np.zeros((16, 16, 3), dtype=np.uint8)
+			raise RuntimeError("render failed")
+		threads = threading.active_count()
+		with tempfile.TemporaryDirectory() as scratch:
+			with asserts.assertRaises(RuntimeError):
+				Animator([]).make_video_from_frames(frames(), write_path=os.path.join(scratch, "failed.mp4"), queue_size=2)
+		asserts.assertEquals(threading.active_count(), threads)
+
+	def test_consumer_stopping_early_stops_producer(self):
+		import threading
+		from animator import prefetch
+		threads = threading.active_count()
+		items = prefetch(iter(range(1000)), queue_size=2)
+		first = [next(items) for _ in range(3)]
+		items.close()
+		asserts.assertEquals([first, threading.active_count()], [[0, 1, 2], threads])
+
+class videoTests(testGroup):
+	def write_video(self, queue_size:int):
+		import os, tempfile
+		import imageio
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		target = animator.retrieve_block_from_id(2)
+		frames = animator.iter_inbetweens(12, target, (1.726, -0.22), (1.9, 0.22), RenderQuality.FAST)
+		with tempfile.TemporaryDirectory() as scratch:
+			write_path = os.path.join(scratch, "nested", "slide.mp4")
+			written = animator.make_video_from_frames(frames, fps=12, write_path=write_path, queue_size=queue_size)
+			with imageio.get_reader(written) as reader:
+				return [written == write_path, reader.get_meta_data()["fps"], reader.count_frames()]
+
+	def test_fps_and_write_path_are_used(self):
+		asserts.assertEquals(self.write_video(queue_size=4), [True, 12.0, 12])
+
+	def test_sequential_mode(self):
+		asserts.assertEquals(self.write_video(queue_size=0), [True, 12.0, 12])
+
+class batchTests(testGroup):
+	def make_scene(self, seed:int, count:int) -> Scene:
+		rng = np.random.default_rng(seed)
+		return Scene.from_arrays(rng.uniform(1, 6, count), rng.uniform(-1, 1, count), rng.uniform(0, 0.4, count), rng.integers(0, 255, size=(count, 3)))
+
+	def test_cameras_match_single_renders(self):
+		scene = self.make_scene(0, 40)
+		cameras = [Camera(x=0.1*i - 0.3, y=0.05*i, theta=0.2 + 0.15*i) for i in range(8)]
+		columns = Renderer(scene).rasterize_batch(cameras=cameras, resolution=500)
+		asserts.assertEquals(
+			[columns.shape, [columns[i].tolist() == Renderer(scene, camera).rasterize(resolution=500).tolist() for i, camera in enumerate(cameras)]],
+			[(8, 500, 3), [True]*8]
+		)
+
+	def test_scenes_match_single_renders(self):
+		scenes = [self.make_scene(seed, count) for seed, count in enumerate([0, 5, 30, 1])]
+		camera = Camera(forced_screen_height=1)
+		columns = Renderer(camera=camera).rasterize_batch(scenes, resolution=300)
+		asserts.assertEquals(
+			[columns[i].tolist() == Renderer(scene, camera).rasterize(resolution=300).tolist() for i, scene in enumerate(scenes)],
+			[True]*4
+		)
+
+	def test_background_blocks_are_transparent(self):
+		scene = self.make_scene(3, 30)
+		scene.color[::3] = BG
+		cameras = [Camera(x=0.1*i, theta=0.4 + 0.1*i) for i in range(4)]
+		columns = Renderer(scene).rasterize_batch(cameras=cameras, resolution=300)
+		asserts.assertEquals(
+			[columns[i].tolist() == Renderer(scene, Camera(x=0.1*i, theta=0.4 + 0.1*i, precision=Precision.REFERENCE)).rasterize(resolution=300).tolist() for i in range(4)],
+			[True]*4
+		)
+
+	def test_chunks_and_compositors_match(self):
+		scene = self.make_scene(2, 30)
+		cameras = [Camera(x=0.05*i, theta=0.3 + 0.1*i) for i in range(7)]
+		renderer = Renderer(scene)
+		whole = renderer.rasterize_batch(cameras=cameras, resolution=400).tolist()
+		asserts.assertEquals(
+			[
+				renderer.rasterize_batch(cameras=cameras, resolution=400, max_slices=1000).tolist() == whole,
+				renderer.rasterize_batch(cameras=cameras, resolution=400, compositor=Compositor.SWEEP, max_slices=1).tolist() == whole,
+			],
+			[True, True]
+		)
+
+	def test_empty_batch(self):
+		renderer = Renderer(self.make_scene(0, 5))
+		asserts.assertEquals(
+			[renderer.rasterize_batch([], resolution=50).shape, renderer.rasterize_batch(cameras=[], resolution=50).shape],
+			[(0, 50, 3), (0, 50, 3)]
+		)
+
+	def test_reference_cameras(self):
+		scene = self.make_scene(1, 10)
+		cameras = [Camera(theta=0.5, precision=Precision.REFERENCE), Camera(forced_screen_height=1, precision=Precision.REFERENCE)]
+		columns = Renderer(scene).rasterize_batch(cameras=cameras, resolution=200)
+		asserts.assertEquals(
+			[columns[i].tolist() == Renderer(scene, camera).rasterize(resolution=200).tolist() for i, camera in enumerate(cameras)],
+			[True, True]
+		)
+
+	def test_mismatched_counts(self):
+		with asserts.assertRaises(ValueError):
+			Renderer().rasterize_batch([self.make_scene(0, 3)]*2, [Camera()]*3)
+
+	def test_frames_and_saving(self):
+		import os, tempfile
+		renderer = Renderer(self.make_scene(2, 20))
+		columns = renderer.rasterize_batch(cameras=[Camera(theta=0.4), Camera(theta=0.9)], resolution=200)
+		frames = renderer.generate_frames(columns, (10, 50), resample=Resample.AREA)
+		with tempfile.TemporaryDirectory() as scratch:
+			paths = renderer.save_frames(frames, os.path.join(scratch, "thumbnails"))
+			names = [os.path.basename(path) for path in paths if os.path.exists(path)]
+		asserts.assertEquals(
+			[frames.shape, frames[1].tolist() == renderer.generate_frame(columns[1], (10, 50), resample=Resample.AREA).tolist(), names],
+			[(2, 50, 10, 3), True, ["00000.png", "00001.png"]]
+		)
+
+class renderCacheTests(testGroup):
+	def test_key_covers_what_changes_a_render(self):
+		from cache import render_key
+		blocks = columnBufferTests().make_scene()
+		key = render_key(blocks, Camera(), BG, 100)
+		moved = columnBufferTests().make_scene()
+		moved[1].y += 1e-9
+		asserts.assertEquals(
+			[
+				key == render_key(columnBufferTests().make_scene(), Camera(), BG, 100),
+				key == render_key(moved, Camera(), BG, 100),
+				key == render_key(blocks, Camera(x=0.1), BG, 100),
+				key == render_key(blocks, Camera(), BLACK, 100),
+				key == render_key(blocks, Camera(), BG, 101),
+				key == render_key(blocks, Camera(), BG, 100, (100, 500)),
+			],
+			[True, False, False, False, False, False]
+		)
+
+	def test_rasterize_hits(self):
+		from cache import RenderCache
+		renderer = Renderer(blocks=columnBufferTests().make_scene(), camera=Camera(forced_screen_height=1))
+		expected = renderer.rasterize(resolution=500)
+		renderer.cache = RenderCache()
+		first = renderer.rasterize(resolution=500)
+		second = renderer.rasterize(resolution=500)
+		renderer.blocks[0].y = 0.1
+		third = renderer.rasterize(resolution=500)
+		stats = renderer.cache.stats
+		asserts.assertEquals(
+			[first.tolist() == expected.tolist(), second.tolist() == expected.tolist(), third.tolist() == expected.tolist(), stats.hits, stats.misses],
+			[True, True, False, 1, 2]
+		)
+
+	def test_memory_eviction(self):
+		from cache import RenderCache
+		render_cache = RenderCache(max_bytes=250)
+		for i in range(4):
+			render_cache.put(str(i), np.zeros(100, dtype=np.uint8))
+		asserts.assertEquals(
+			[len(render_cache), render_cache.stats.evictions, render_cache.get("0") is None, render_cache.get("3") is not None],
+			[2, 2, True, True]
+		)
+
+	def test_disk_tier(self):
+		import os, tempfile
+		from cache import RenderCache
+		with tempfile.TemporaryDirectory() as scratch:
+			RenderCache(directory=scratch).put("a", np.arange(10))
+			reopened = RenderCache(directory=scratch, max_disk_bytes=10_000)
+			found = reopened.get("a")
+			for i in range(40):
+				reopened.put(f"b{i}", np.zeros(100))
+			on_disk = len([name for name in os.listdir(scratch) if name.endswith(".npy")])
+			asserts.assertEquals(
+				[found.tolist(), reopened.stats.disk_hits, reopened.stats.disk_evictions > 0, reopened.disk_bytes <= 10_000, on_disk < 41],
+				[list(range(10)), 1, True, True, True]
+			)
+
+	def test_slide_frames_come_from_cache(self):
+		from cache import RenderCache
+		from animator import Animator, RenderQuality
+		render_cache = RenderCache()
+		runs = []
+		for _ in range(2):
+			animator = Animator(columnBufferTests().make_scene())
+			animator.cache = render_cache
+			target = animator.retrieve_block_from_id(2)
+			runs.append(list(animator.iter_inbetweens(10, target, (1.726, -0.22), (1.9, 0.22), RenderQuality.FAST)))
+		uncached = Animator(columnBufferTests().make_scene())
+		expected = list(uncached.iter_inbetweens(10, uncached.retrieve_block_from_id(2), (1.726, -0.22), (1.9, 0.22), RenderQuality.FAST))
+		asserts.assertEquals(
+			[[(a == b).all() and (a == c).all() for a, b, c in zip(*runs, expected)], animator.frame_stats.cached],
+			[[True]*10, 10]
+		)
+
+	def test_repeated_positions_skip_rendering(self):
+		from cache import RenderCache
+		from timeline import Timeline
+		from animator import Animator, RenderQuality
+		make_scene = columnBufferTests().make_scene
+		timeline = Timeline(9)
+		for frame, position in enumerate([(1.726, -0.22), (1.9, 0.2)] * 5):
+			if 2*frame < 9:
+				timeline.add_keyframe(2, 2*frame, *position)
+		animator = Animator(make_scene())
+		animator.cache = RenderCache()
+		frames = list(animator.iter_timeline(timeline, RenderQuality.FAST))
+		reference = Animator(make_scene())
+		expected = list(reference.iter_timeline(timeline, RenderQuality.FAST))
+		asserts.assertEquals(
+			[all((a == b).all() for a, b in zip(frames, expected)), animator.frame_stats.cached, animator.frame_stats.rendered],
+			[True, 5, 3]
+		)
+
+class adaptiveTests(testGroup):
+	def make_scene(self, seed:int, count:int) -> Scene:
+		return batchTests().make_scene(seed, count)
+
+	def test_runs_match_uniform_render(self):
+		matches = []
+		for seed, count in enumerate([0, 1, 12, 80]):
+			renderer = Renderer(self.make_scene(seed, count), Camera(x=0.05*seed, forced_screen_height=1))
+			for compositor in Compositor:
+				runs = renderer.rasterize_runs(resolution=100_000, compositor=compositor)
+				matches.append(runs.dense().tolist() == renderer.rasterize(resolution=100_000, compositor=compositor).tolist())
+		asserts.assertEquals(matches, [True]*16)
+
+	def test_runs_merge_equal_colors(self):
+		column = np.array([[1, 1, 1]]*3 + [[2, 2, 2]]*2 + [[1, 1, 1]], dtype=np.uint8)
+		runs = ColumnRuns.from_column(column)
+		asserts.assertEquals(
+			[runs.starts.tolist(), runs.lengths.tolist(), runs.dense().tolist() == column.tolist(), runs.run_at(np.array([0, 2, 3, 5])).tolist()],
+			[[0, 3, 5], [3, 2, 1], True, [0, 0, 1, 2]]
+		)
+
+	def test_frames_match_uniform_frames(self):
+		renderer = Renderer(self.make_scene(3, 50), Camera(forced_screen_height=1))
+		runs = renderer.rasterize_runs(resolution=6_000)
+		column = renderer.rasterize(resolution=6_000)
+		asserts.assertEquals(
+			[renderer.generate_frame(runs, (20, 300), resample=resample).tolist() == renderer.generate_frame(column, (20, 300), resample=resample).tolist() for resample in Resample],
+			[True]*len(Resample)
+		)
+
+	def test_reference_precision(self):
+		renderer = Renderer(self.make_scene(4, 10), Camera(forced_screen_height=1, precision=Precision.REFERENCE))
+		asserts.assertEquals(
+			renderer.rasterize_runs(resolution=300).dense().tolist(),
+			renderer.rasterize(resolution=300).tolist()
+		)
+
+	def test_buffer_follows_moves(self):
+		scene = self.make_scene(5, 60)
+		renderer = Renderer(scene, Camera(forced_screen_height=1))
+		column_buffer = AdaptiveBuffer(renderer, scene, 20_000)
+		rng = np.random.default_rng(5)
+		matches = []
+		for step in range(10):
+			rows = rng.choice(len(scene), 3, replace=False)
+			scene.y[rows] += rng.normal(0, 0.2, 3)
+			if step == 5:
+				renderer.camera.x = 0.3
+			column_buffer.update(rows)
+			matches.append(column_buffer.column.dense().tolist() == renderer.rasterize(scene, 20_000).tolist())
+		asserts.assertEquals(matches, [True]*10)
+
+	def test_slide_matches_accurate(self):
+		from animator import Animator, RenderQuality
+		frames = []
+		for quality in (RenderQuality.ACCURATE, RenderQuality.ADAPTIVE):
+			animator = Animator(columnBufferTests().make_scene())
+			target = animator.retrieve_block_from_id(2)
+			frames.append(list(animator.iter_inbetweens(12, target, (1.726, -0.22), (5.4, 0.22), quality)))
+		asserts.assertEquals(
+			[np.array_equal(accurate, adaptive) for accurate, adaptive in zip(*frames)],
+			[True]*12
+		)
+
+class frameStoreTests(testGroup):
+	def slide_frames(self, first_frame:int=0):
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		target = animator.retrieve_block_from_id(2)
+		return list(animator.iter_inbetweens(20, target, (1.726, -0.22), (1.9, 0.22), RenderQuality.FAST, first_frame=first_frame))
+
+	def record(self, directory:str, checkpoint_every:int=30) -> int:
+		from animator import Animator, RenderQuality
+		animator = Animator(columnBufferTests().make_scene())
+		return animator.record_slide(2, (1.726, -0.22), (1.9, 0.22), 20, directory, RenderQuality.FAST, checkpoint_every=checkpoint_every)
+
+	def test_records_every_frame(self):
+		import tempfile
+		from framestore import FrameStore
+		with tempfile.TemporaryDirectory() as scratch:
+			rendered = self.record(scratch)
+			with FrameStore.open(scratch) as store:
+				recorded = store.completed_frames.tolist() == np.array(self.slide_frames()).tolist()
+				asserts.assertEquals([rendered, store.done, recorded], [20, True, True])
+
+	def test_checkpoints_count_only_saved_frames(self):
+		import tempfile
+		from framestore import FrameStore
+		with tempfile.TemporaryDirectory() as scratch:
+			# dies after 13 frames without closing the store
+			store = FrameStore.resume(scratch, 20, (100, 500), checkpoint_every=5)
+			for frame in self.slide_frames()[:13]:
+				store.append(frame)
+			asserts.assertEquals(FrameStore.open(scratch).completed, 10)
+
+	def test_resumes_interrupted_slide(self):
+		import tempfile
+		from animator import Animator, RenderQuality
+		from framestore import FrameStore
+
+		class InterruptedAnimator(Animator):
+			def iter_inbetweens(self, *args, **kwargs):
+				for index, frame in enumerate(super().iter_inbetweens(*args, **kwargs)):
+					if index == 13:
+						raise KeyboardInterrupt
+					yield frame
+
+		with tempfile.TemporaryDirectory() as scratch:
+			with asserts.assertRaises(KeyboardInterrupt):
+				InterruptedAnimator(columnBufferTests().make_scene()).record_slide(2, (1.726, -0.22), (1.9, 0.22), 20, scratch, RenderQuality.FAST)
+			saved = FrameStore.open(scratch).completed
+			rendered = self.record(scratch)
+			with FrameStore.open(scratch) as store:
+				recorded = store.completed_frames.tolist() == np.array(self.slide_frames()).tolist()
+			asserts.assertEquals([saved, rendered, recorded], [13, 7, True])
+
+	def test_other_render_is_not_resumed(self):
+		import tempfile
+		from animator import Animator, RenderQuality
+		with tempfile.TemporaryDirectory() as scratch:
+			self.record(scratch)
+			animator = Animator(columnBufferTests().make_scene())
+			with asserts.assertRaises(ValueError):
+				animator.record_slide(2, (1.726, -0.22), (1.8, 0.22), 20, scratch, RenderQuality.FAST)
+
+	def test_partial_frames_match(self):
+		asserts.assertEquals(
+			np.array(self.slide_frames(first_frame=7)).tolist(),
+			np.array(self.slide_frames()[7:]).tolist()
+		)
+
+	def test_encode_from_frames(self):
+		import os, tempfile
+		import imageio
+		from animator import Animator
+		with tempfile.TemporaryDirectory() as scratch:
+			self.record(os.path.join(scratch, "frames"))
+			written = Animator([]).encode_frames(os.path.join(scratch, "frames"), fps=10, write_path=os.path.join(scratch, "slide.mp4"))
+			with imageio.get_reader(written) as reader:
+				asserts.assertEquals([reader.get_meta_data()["fps"], reader.count_frames()], [10.0, 20])
+
+class jobTests(testGroup):
+	def make_spec(self, name:str, **extra) -> dict:
+		spec = {
+			"name": name,
+			"blocks": [{"x": 1.726, "y": -0.22, "height": 0.072, "color": [0, 255, 255]}, {"x": 5, "y": 0, "height": 100}],
+			"slide": {"block_id": 1, "start": [1.726, -0.22], "end": [1.9, 0.22], "frame_count": 6},
+			"quality": "FAST",
+		}
+		spec.update(extra)
+		return spec
+
+	def test_reads_json_and_json_lines(self):
+		import json, os, tempfile
+		from jobs import read_specs
+		specs = [self.make_spec("a"), self.make_spec("b")]
+		with tempfile.TemporaryDirectory() as scratch:
+			with open(os.path.join(scratch, "jobs.json"), "w") as file:
+				json.dump(specs, file)
+			with open(os.path.join(scratch, "jobs.jsonl"), "w") as file:
+				file.write("".join(json.dumps(spec) + "\n\n" for spec in specs))
+			asserts.assertEquals(
+				[read_specs(os.path.join(scratch, "jobs.json")), read_specs(os.path.join(scratch, "jobs.jsonl"))],
+				[specs, specs]
+			)
+
+	def test_bad_and_clashing_jobs_are_rejected(self):
+		from jobs import plan_jobs
+		specs = [
+			self.make_spec("a"),
+			self.make_spec("b", output="a.mp4"),
+			self.make_spec("a", output="other.mp4"),
+			self.make_spec("c", quality="BEST"),
+			{"name": "d", "blocks": [{"x": 1, "y": 0, "height": 1}]},
+		]
+		jobs, rejected = plan_jobs(specs, "outputs")
+		asserts.assertEquals(
+			[[job.name for job in jobs], [result.index for result in rejected]],
+			[["a"], [1, 2, 3, 4]]
+		)
+
+	def run_batch(self, workers:int):
+		import os, tempfile
+		from jobs import run_jobs
+		timeline = {"frame_count": 5, "keyframes": [{"block_id": 1, "frame": 0, "x": 1.7, "y": 0}, {"block_id": 1, "frame": 4, "x": 2, "y": 0.1, "easing": "ease_in"}]}
+		specs = [
+			self.make_spec("slide"),
+			self.make_spec("missing-block", slide={"block_id": 9, "start": [0, 0], "end": [1, 1], "frame_count": 3}),
+			{key: value for key, value in self.make_spec("timeline", timeline=timeline).items() if key != "slide"},
+		]
+		with tempfile.TemporaryDirectory() as scratch:
+			report = run_jobs(specs, scratch, workers=workers)
+			written = sorted(os.listdir(scratch))
+		return [[result.ok for result in report.results], [result.frames for result in report.results], written]
+
+	def test_batch_isolates_outputs_and_failures(self):
+		asserts.assertEquals(self.run_batch(workers=1), [[True, False, True], [6, 0, 5], ["slide.mp4", "timeline.mp4"]])
+
+	def test_worker_pool(self):
+		asserts.assertEquals(self.run_batch(workers=2), [[True, False, True], [6, 0, 5], ["slide.mp4", "timeline.mp4"]])
+
+	def test_paths_stay_inside_their_directories(self):
+		import os, tempfile
+		from jobs import plan_jobs
+		with tempfile.TemporaryDirectory() as scratch:
+			specs = [
+				self.make_spec("../escape"),
+				self.make_spec("a/b"),
+				self.make_spec("up", output="../up.mp4"),
+				self.make_spec("absolute", output=os.path.join(os.path.dirname(scratch), "absolute.mp4")),
+				self.make_spec("ok", output="nested/ok.mp4"),
+			]
+			jobs, rejected = plan_jobs(specs, os.path.join(scratch, "out"), os.path.join(scratch, "frames"))
+			asserts.assertEquals(
+				[[job.output for job in jobs], [job.frames_directory for job in jobs], [result.index for result in rejected]],
+				[[os.path.join(scratch, "out", "nested", "ok.mp4")], [os.path.join(scratch, "frames", "ok")], [0, 1, 2, 3]]
+			)
+
+	def test_camera_defaults_to_screen_height(self):
+		from jobs import make_animator
+		blocks = self.make_spec("camera")["blocks"]
+		panned = make_animator({"blocks": blocks, "camera": {"x": 0.5}}).camera
+		turned = make_animator({"blocks": blocks, "camera": {"theta": 0.7}}).camera
+		asserts.assertEquals(
+			[panned.x, panned.theta, make_animator({"blocks": blocks}).camera.theta, turned.theta],
+			[0.5, Camera(forced_screen_height=1).theta, Camera(forced_screen_height=1).theta, 0.7]
+		)
+
+	def test_dead_worker_only_fails_its_job(self):
+		import tempfile
+		import jobs
+		global original_run_job
+		original_run_job = jobs.run_job
+		jobs.run_job = run_job_or_die
+		try:
+			with tempfile.TemporaryDirectory() as scratch:
+				report = jobs.run_jobs([self.make_spec(name) for name in ("a", "dies", "b", "c")], scratch, workers=2)
+		finally:
+			jobs.run_job = original_run_job
+		asserts.assertEquals(
+			[[result.name for result in report.results], [result.ok for result in report.results], report.results[1].error],
+			[["a", "dies", "b", "c"], [True, False, True, True], "its worker process died"]
+		)
+
+	def test_command_line_resumes_with_frames_dir(self):
+		import json, os, tempfile
+		from jobs import main
+		from framestore import FrameStore
+		with tempfile.TemporaryDirectory() as scratch:
+			specs = os.path.join(scratch, "jobs.jsonl")
+			with open(specs, "w") as file:
+				file.write(json.dumps(self.make_spec("slide")) + "\n" + json.dumps(self.make_spec("broken", quality="BEST")) + "\n")
+			report = os.path.join(scratch, "report.jsonl")
+			arguments = [specs, "--workers", "2", "--output-dir", os.path.join(scratch, "out"), "--frames-dir", os.path.join(scratch, "frames"), "--report", report]
+			first = main(arguments)
+			# as if the first run had died after 2 frames
+			frames = os.path.join(scratch, "frames", "slide")
+			with FrameStore.open(frames) as store:
+				expected = store.completed_frames.tolist()
+				store.completed = 2
+				store.write_manifest()
+			os.remove(os.path.join(scratch, "out", "slide.mp4"))
+			second = main(arguments)
+			with FrameStore.open(frames) as store:
+				resumed = [store.completed, store.completed_frames.tolist() == expected]
+			with open(report) as file:
+				results = [json.loads(line) for line in file]
+			asserts.assertEquals(
+				[
+					first, second, resumed,
+					[(result["name"], result["error"] is None, result["frames"]) for result in results],
+					os.listdir(os.path.join(scratch, "out"))
+				],
+				# only the 4 frames after the 2 already on disk were rendered the second time
+				[1, 1, [6, True], [("slide", True, 4), ("broken", False, 0)], ["slide.mp4"]]
+			)
+
+def run_job_or_die(job):
+	# stands in for `jobs.run_job` on the worker processes: the job named "dies" kills its worker
+	import os
+	if job.name == "dies":
+		os._exit(1)
+	return original_run_job(job)
+
+test_all(mainTests, continuousRangeTests, projectionTests, colorTests, spanVectorTests, rasterizeTests, cullingTests, precisionTests, columnBufferTests, sceneTests, benchmarkTests, timelineTests, frameReuseTests, parallelTests, cameraTests, profilingTests, importTests, prefetchTests, videoTests, batchTests, renderCacheTests, adaptiveTests, frameStoreTests, jobTests)
\ No newline at end of file
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class Easing(Enum):
+	'''
+	How a block gets from one keyframe to the next. Each maps progress `t` in [0, 1] to eased progress in [0, 1].
+	'''
+	LINEAR = "linear"
+	EASE_IN = "ease_in"
+	EASE_OUT = "ease_out"
+	EASE_IN_OUT = "ease_in_out"
+
+	def apply(self, t:NDArray[np.float64]) -> NDArray[np.float64]:
+		if self is Easing.EASE_IN:
+			return t * t
+		if self is Easing.EASE_OUT:
+			return t * (2 - t)
+		if self is Easing.EASE_IN_OUT:
+			return t * t * (3 - 2*t)
+		return t
+
+
+@dataclass(frozen=True)
+class Keyframe:
+	'''
+	Where a block is on `frame`. `easing` applies to the stretch leading up to this keyframe.
+	'''
+	frame:int
+	x:float
+	y:float
+	easing:Easing = Easing.LINEAR
+
+
+@dataclass
+class Track:
+	block_id:int
+	keyframes:List[Keyframe] = field(default_factory=list)
+
+
+class Timeline:
+	'''
+	Keyframed positions for any number of blocks, and optionally the camera, over `frame_count` frames.
+	Everything holds its first keyframe's position before it and its last one's after it.
+
+	`evaluate` works out every tracked block's position on every frame in one go.
+	'''
+	def __init__(self, frame_count:int) -> None:
+		if frame_count < 0:
+			raise ValueError("frame_count can't be negative")
+		self.frame_count = frame_count
+		self.tracks:Dict[int, Track] = {}
+		self.camera_keyframes:List[Keyframe] = []
+
+	def add_keyframe(self, block_id:int, frame:int, x:float, y:float, easing:Easing=Easing.LINEAR) -> "Timeline":
+		track = self.tracks.setdefault(block_id, Track(block_id))
+		track.keyframes = self.insert(track.keyframes, Keyframe(frame, x, y, easing))
+		return self
+
+	def add_camera_keyframe(self, frame:int, x:float, y:float, easing:Easing=Easing.LINEAR) -> "Timeline":
+		self.camera_keyframes = self.insert(self.camera_keyframes, Keyframe(frame, x, y, easing))
+		return self
+
+	def insert(self, keyframes:List[Keyframe], new_keyframe:Keyframe) -> List[Keyframe]:
+		'''
+		returns `keyframes` sorted with `new_keyframe` added, replacing any other keyframe on the same frame.
+		'''
+		if not 0 <= new_keyframe.frame < self.frame_count:
+			raise ValueError(f"frame {new_keyframe.frame} is outside the timeline (0 to {self.frame_count - 1})")
+		keyframes = [keyframe for keyframe in keyframes if keyframe.frame != new_keyframe.frame]
+		keyframes.append(new_keyframe)
+		keyframes.sort(key=lambda keyframe: keyframe.frame)
+		return keyframes
+
+	def move(
+			self,
+			block_id:int,
+			start:Tuple[float,float],
+			end:Tuple[float,float],
+			start_frame:int=0,
+			end_frame:int|None=None,
+			easing:Easing=Easing.LINEAR
+		) -> "Timeline":
+		'''
+		Shorthand for the two keyframes of a move from `start` to `end`.
+		'''
+		end_frame = self.frame_count - 1 if end_frame is None else end_frame
+		self.add_keyframe(block_id, start_frame, *start)
+		return self.add_keyframe(block_id, end_frame, *end, easing=easing)
+
+	def move_camera(
+			self,
+			start:Tuple[float,float],
+			end:Tuple[float,float],
+			start_frame:int=0,
+			end_frame:int|None=None,
+			easing:Easing=Easing.LINEAR
+		) -> "Timeline":
+		end_frame = self.frame_count - 1 if end_frame is None else end_frame
+		self.add_camera_keyframe(start_frame, *start)
+		return self.add_camera_keyframe(end_frame, *end, easing=easing)
+
+	@property
+	def block_ids(self) -> List[int]:
+		return list(self.tracks)
+
+	def evaluate(self) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+		'''
+		returns `x` and `y` arrays of shape `(frame_count, len(block_ids))`.
+		'''
+		frames = np.arange(self.frame_count)
+		x = np.empty((self.frame_count, len(self.tracks)))
+		y = np.empty((self.frame_count, len(self.tracks)))
+		for column, track in enumerate(self.tracks.values()):
+			x[:, column], y[:, column] = self.evaluate_track(track.keyframes, frames)
+		return x, y
+
+	def evaluate_camera(self) -> Optional[Tuple[NDArray[np.float64], NDArray[np.float64]]]:
+		'''
+		returns the camera's `x` and `y` on every frame, or None if the camera has no keyframes.
+		'''
+		if not self.camera_keyframes:
+			return None
+		return self.evaluate_track(self.camera_keyframes, np.arange(self.frame_count))
+
+	def evaluate_track(self, keyframes:Sequence[Keyframe], frames:NDArray[np.int64]) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+		key_frames = np.array([keyframe.frame for keyframe in keyframes])
+		key_x = np.array([keyframe.x for keyframe in keyframes], dtype=np.float64)
+		key_y = np.array([keyframe.y for keyframe in keyframes], dtype=np.float64)
+		if len(keyframes) == 1:
+			return np.full(len(frames), key_x[0]), np.full(len(frames), key_y[0])
+
+		# the keyframe each frame is heading towards, and how far along the way there it is
+		target = np.clip(np.searchsorted(key_frames, frames, side="right"), 1, len(keyframes) - 1)
+		previous = target - 1
+		progress = np.clip((frames - key_frames[previous]) / (key_frames[target] - key_frames[previous]), 0, 1)
+
+		eased = progress.copy()
+		easings = np.array([keyframe.easing for keyframe in keyframes], dtype=object)
+		for easing in set(easings.tolist()):
+			segment = easings[target] == easing
+			eased[segment] = easing.apply(progress[segment])
+
+		# land exactly on a keyframe once it's reached, rather than wherever the rounding of the sum puts it
+		arrived = progress >= 1
+		x = np.where(arrived, key_x[target], key_x[previous] + (key_x[target] - key_x[previous]) * eased)
+		y = np.where(arrived, key_y[target], key_y[previous] + (key_y[target] - key_y[previous]) * eased)
+		return x, y
+
+	def changes(self, x:NDArray[np.float64], y:NDArray[np.float64]) -> NDArray[np.bool_]:
+		'''
+		`(frame_count, len(block_ids))` mask of which blocks moved on each frame. Everything counts as moved on frame 0.
+		'''
+		moved = np.ones_like(x, dtype=np.bool_)
+		moved[1:] = (x[1:] != x[:-1]) | (y[1:] != y[:-1])
+		return moved